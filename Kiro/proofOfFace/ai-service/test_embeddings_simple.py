@@ -7,7 +7,6 @@ Uses mock processor to test without face_recognition dependencies
 import sys
 import os
 import numpy as np
-from PIL import Image, ImageDraw
 import io
 import json
 
@@ -19,6 +18,9 @@ from utils.face_processor_mock import create_mock_face_processor
 
 def create_test_image(width=300, height=300, with_face=True):
     """Create a test image with or without face-like pattern"""
+    # Imported lazily so the pure-numpy tests never pay for PIL
+    from PIL import Image, ImageDraw
+    
     img = Image.new('RGB', (width, height), color='white')
     
     if with_face:
@@ -201,12 +203,18 @@ def main():
     print("Using Mock Face Processor (no face_recognition dependency)")
     print()
     
+    # PYTEST_SKIP_IMAGES=1 runs only the image-free validation/hash/error tests
+    skip_images = os.environ.get('PYTEST_SKIP_IMAGES') == '1'
+    
     try:
-        # Test embedding extraction
-        embeddings = test_embedding_extraction()
-        
-        # Test embedding comparison
-        test_embedding_comparison()
+        if skip_images:
+            print("⏭️  PYTEST_SKIP_IMAGES=1: skipping image-based tests")
+        else:
+            # Test embedding extraction
+            embeddings = test_embedding_extraction()
+            
+            # Test embedding comparison
+            test_embedding_comparison()
         
         # Test validation
         test_validation()
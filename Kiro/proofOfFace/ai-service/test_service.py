@@ -5,178 +5,303 @@ Simple tests to verify the service is working correctly
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import time
 import os
+import hashlib
+import tempfile
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 from PIL import Image
 import numpy as np
 
+try:
+    from requests_toolbelt.multipart.encoder import MultipartEncoder
+except ImportError:  # Optional: fall back to requests' buffered multipart body
+    MultipartEncoder = None
+
+
+def _new_session():
+    """
+    Create a keep-alive session
+    
+    requests.Session is not guaranteed to be thread-safe, so every thread
+    that issues requests gets its own.
+    """
+    session = requests.Session()
+    session.mount('http://', HTTPAdapter(max_retries=0))
+    return session
+
+
+def _post_file(session, url, field, filename, fileobj, content_type, **kwargs):
+    """
+    POST a single file as multipart/form-data
+    
+    With requests-toolbelt installed the body is streamed from fileobj
+    into the socket instead of being assembled in memory first.
+    """
+    if MultipartEncoder is None:
+        files = {field: (filename, fileobj, content_type)}
+        return session.post(url, files=files, **kwargs)
+    
+    encoder = MultipartEncoder(fields={field: (filename, fileobj, content_type)})
+    return session.post(url, data=encoder, headers={'Content-Type': encoder.content_type}, **kwargs)
+
+
+# On-disk PNG cache shared across runs; entries older than this script are stale
+IMAGE_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'proof_test_imgs')
+
+
+def _cached_png(key, render):
+    """Return PNG bytes for key from the disk cache, rendering on a miss"""
+    digest = hashlib.sha1(key.encode()).hexdigest()
+    path = os.path.join(IMAGE_CACHE_DIR, f'{digest}.png')
+    
+    try:
+        if os.path.getmtime(path) >= os.path.getmtime(__file__):
+            with open(path, 'rb') as f:
+                return f.read()
+    except OSError:
+        pass
+    
+    png_bytes = render()
+    os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+    # Write to a private file and rename it into place, so a concurrent run
+    # never reads a half-written PNG
+    fd, tmp_path = tempfile.mkstemp(dir=IMAGE_CACHE_DIR, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(png_bytes)
+        os.replace(tmp_path, path)
+    except OSError:
+        os.unlink(tmp_path)
+        raise
+    return png_bytes
+
+
+def _run_test(test_name, test_func, base_url):
+    """
+    Run one test in a worker thread with its own session
+    
+    Returns:
+        (result, report lines) so the main thread can print each test's
+        report in order
+    """
+    lines = []
+    try:
+        with _new_session() as session:
+            result = test_func(base_url, session, lines.append)
+    except Exception as e:
+        lines.append(f"❌ {test_name} failed with exception: {str(e)}")
+        result = False
+    return result, lines
+
 
 def create_test_image():
-    """Create a simple test image with a face-like pattern"""
-    # Create a 200x200 RGB image
-    img = Image.new('RGB', (200, 200), color='white')
-    pixels = img.load()
+    """
+    Create a simple test image with a face-like pattern
+    
+    Returns:
+        BytesIO positioned at the start of the PNG data; requests streams it
+        into the multipart body directly. BytesIO shares the cached bytes
+        object until written to, so wrapping it makes no copy.
+    """
+    return BytesIO(_cached_png('default', _render_test_image))
+
+
+def _render_test_image():
+    """Draw the face-like test pattern and encode it as PNG bytes"""
+    # Pixel coordinate grids for a 200x200 image
+    ys, xs = np.mgrid[0:200, 0:200]
     
     # Draw a simple face-like pattern
     # Face outline (circle)
     center_x, center_y = 100, 100
     radius = 80
+    distance = np.hypot(xs - center_x, ys - center_y)
+    outline = np.abs(distance - radius) < 2
     
-    for x in range(200):
-        for y in range(200):
-            distance = ((x - center_x) ** 2 + (y - center_y) ** 2) ** 0.5
-            
-            # Face outline
-            if abs(distance - radius) < 2:
-                pixels[x, y] = (0, 0, 0)
-            
-            # Eyes
-            elif ((x - 80) ** 2 + (y - 80) ** 2) < 100 or ((x - 120) ** 2 + (y - 80) ** 2) < 100:
-                pixels[x, y] = (0, 0, 0)
-            
-            # Mouth
-            elif 90 < x < 110 and 130 < y < 140:
-                pixels[x, y] = (0, 0, 0)
+    # Eyes
+    eyes = ((xs - 80) ** 2 + (ys - 80) ** 2 < 100) | ((xs - 120) ** 2 + (ys - 80) ** 2 < 100)
+    
+    # Mouth
+    mouth = (xs > 90) & (xs < 110) & (ys > 130) & (ys < 140)
+    
+    pixels = np.full((200, 200, 3), 255, dtype=np.uint8)
+    pixels[outline | eyes | mouth] = 0
+    
+    # Wrap the RGB buffer directly instead of copying it into a new image
+    img = Image.frombuffer('RGB', (200, 200), pixels, 'raw', 'RGB', 0, 1)
     
     # Save to bytes
     img_bytes = BytesIO()
     img.save(img_bytes, format='PNG')
-    img_bytes.seek(0)
     
     return img_bytes.getvalue()
 
 
-def test_health_check(base_url):
+def test_health_check(base_url, session, log=print):
     """Test the health check endpoint"""
-    print("🔍 Testing health check endpoint...")
+    log("🔍 Testing health check endpoint...")
     
     try:
-        response = requests.get(f"{base_url}/health", timeout=10)
+        response = session.get(f"{base_url}/health", timeout=10)
         
         if response.status_code == 200:
             data = response.json()
-            print(f"✅ Health check passed")
-            print(f"   Service: {data.get('service')}")
-            print(f"   Version: {data.get('version')}")
-            print(f"   Status: {data.get('status')}")
-            print(f"   Environment: {data.get('environment')}")
+            log(f"✅ Health check passed")
+            log(f"   Service: {data.get('service')}")
+            log(f"   Version: {data.get('version')}")
+            log(f"   Status: {data.get('status')}")
+            log(f"   Environment: {data.get('environment')}")
             return True
         else:
-            print(f"❌ Health check failed: {response.status_code}")
+            log(f"❌ Health check failed: {response.status_code}")
             return False
             
     except Exception as e:
-        print(f"❌ Health check error: {str(e)}")
+        log(f"❌ Health check error: {str(e)}")
         return False
 
 
-def test_config_endpoint(base_url):
+def test_config_endpoint(base_url, session, log=print):
     """Test the configuration endpoint"""
-    print("\n🔍 Testing configuration endpoint...")
+    log("\n🔍 Testing configuration endpoint...")
     
     try:
-        response = requests.get(f"{base_url}/config", timeout=10)
+        response = session.get(f"{base_url}/config", timeout=10)
         
         if response.status_code == 200:
             data = response.json()
-            print(f"✅ Configuration endpoint working")
-            print(f"   Face Recognition Model: {data.get('face_recognition_model')}")
-            print(f"   Tolerance: {data.get('face_recognition_tolerance')}")
-            print(f"   Max Image Size: {data.get('max_image_size')} bytes")
-            print(f"   Allowed Extensions: {data.get('allowed_extensions')}")
+            log(f"✅ Configuration endpoint working")
+            log(f"   Face Recognition Model: {data.get('face_recognition_model')}")
+            log(f"   Tolerance: {data.get('face_recognition_tolerance')}")
+            log(f"   Max Image Size: {data.get('max_image_size')} bytes")
+            log(f"   Allowed Extensions: {data.get('allowed_extensions')}")
             return True
         else:
-            print(f"❌ Configuration endpoint failed: {response.status_code}")
+            log(f"❌ Configuration endpoint failed: {response.status_code}")
             return False
             
     except Exception as e:
-        print(f"❌ Configuration endpoint error: {str(e)}")
+        log(f"❌ Configuration endpoint error: {str(e)}")
         return False
 
 
-def test_process_face_no_image(base_url):
+def test_process_face_no_image(base_url, session, log=print):
     """Test process-face endpoint with no image"""
-    print("\n🔍 Testing process-face endpoint (no image)...")
+    log("\n🔍 Testing process-face endpoint (no image)...")
     
     try:
-        response = requests.post(f"{base_url}/process-face", timeout=10)
+        response = session.post(f"{base_url}/process-face", timeout=10)
         
         if response.status_code == 400:
             data = response.json()
-            print(f"✅ Correctly rejected request with no image")
-            print(f"   Error: {data.get('error')}")
+            log(f"✅ Correctly rejected request with no image")
+            log(f"   Error: {data.get('error')}")
             return True
         else:
-            print(f"❌ Expected 400 error, got: {response.status_code}")
+            log(f"❌ Expected 400 error, got: {response.status_code}")
             return False
             
     except Exception as e:
-        print(f"❌ Process face (no image) error: {str(e)}")
+        log(f"❌ Process face (no image) error: {str(e)}")
         return False
 
 
-def test_process_face_with_image(base_url):
+def test_process_face_with_image(base_url, session, log=print):
     """Test process-face endpoint with test image"""
-    print("\n🔍 Testing process-face endpoint (with test image)...")
+    log("\n🔍 Testing process-face endpoint (with test image)...")
     
     try:
         # Create test image
         test_image = create_test_image()
         
         # Send request
-        files = {'image': ('test_face.png', test_image, 'image/png')}
-        response = requests.post(f"{base_url}/process-face", files=files, timeout=30)
+        response = _post_file(session, f"{base_url}/process-face", 'image', 'test_face.png',
+                              test_image, 'image/png', timeout=30)
         
-        print(f"   Response status: {response.status_code}")
+        log(f"   Response status: {response.status_code}")
         
         if response.status_code == 200:
             data = response.json()
-            print(f"✅ Face processing successful")
-            print(f"   Success: {data.get('success')}")
-            print(f"   Biometric Hash: {data.get('biometric_hash', 'N/A')[:32]}...")
-            print(f"   Quality Score: {data.get('quality_score')}")
-            print(f"   Processing Time: {data.get('processing_time')} seconds")
+            log(f"✅ Face processing successful")
+            log(f"   Success: {data.get('success')}")
+            log(f"   Biometric Hash: {data.get('biometric_hash', 'N/A')[:32]}...")
+            log(f"   Quality Score: {data.get('quality_score')}")
+            log(f"   Processing Time: {data.get('processing_time')} seconds")
             return True
         elif response.status_code == 400:
             data = response.json()
-            print(f"⚠️  Face processing failed (expected for test image)")
-            print(f"   Error: {data.get('error')}")
-            print(f"   Message: {data.get('message')}")
+            log(f"⚠️  Face processing failed (expected for test image)")
+            log(f"   Error: {data.get('error')}")
+            log(f"   Message: {data.get('message')}")
             return True  # This is expected for our simple test image
         else:
-            print(f"❌ Unexpected response: {response.status_code}")
+            log(f"❌ Unexpected response: {response.status_code}")
             try:
-                print(f"   Response: {response.json()}")
+                log(f"   Response: {response.json()}")
             except:
-                print(f"   Response text: {response.text}")
+                log(f"   Response text: {response.text}")
             return False
             
     except Exception as e:
-        print(f"❌ Process face (with image) error: {str(e)}")
+        log(f"❌ Process face (with image) error: {str(e)}")
         return False
 
 
-def test_invalid_endpoint(base_url):
+def test_invalid_endpoint(base_url, session, log=print):
     """Test invalid endpoint"""
-    print("\n🔍 Testing invalid endpoint...")
+    log("\n🔍 Testing invalid endpoint...")
     
     try:
-        response = requests.get(f"{base_url}/invalid-endpoint", timeout=10)
+        response = session.get(f"{base_url}/invalid-endpoint", timeout=10)
         
         if response.status_code == 404:
-            print(f"✅ Correctly returned 404 for invalid endpoint")
+            log(f"✅ Correctly returned 404 for invalid endpoint")
             return True
         else:
-            print(f"❌ Expected 404, got: {response.status_code}")
+            log(f"❌ Expected 404, got: {response.status_code}")
             return False
             
     except Exception as e:
-        print(f"❌ Invalid endpoint test error: {str(e)}")
+        log(f"❌ Invalid endpoint test error: {str(e)}")
         return False
 
 
+def wait_for_service(base_url, timeout=10.0, initial_delay=0.05, max_delay=1.0):
+    """
+    Poll the health endpoint with exponential backoff until it answers
+    
+    Args:
+        base_url: Base URL of the service
+        timeout: Maximum number of seconds to wait
+        initial_delay: First backoff delay in seconds
+        max_delay: Upper bound for a single backoff delay
+        
+    Returns:
+        True if the service responded with 200 before the timeout
+    """
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    
+    with _new_session() as session:
+        while True:
+            try:
+                if session.get(f"{base_url}/health", timeout=1).status_code == 200:
+                    return True
+            except requests.exceptions.RequestException:
+                pass
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, max_delay)
+
+
 def run_all_tests(base_url="http://localhost:5000"):
     """Run all tests"""
     print(f"🚀 Starting ProofOfFace AI Service Tests")
@@ -193,13 +318,18 @@ def run_all_tests(base_url="http://localhost:5000"):
     
     results = []
     
-    for test_name, test_func in tests:
-        try:
-            result = test_func(base_url)
+    # The endpoint checks are independent, so issue them concurrently and
+    # print each test's report from here in declaration order
+    with ThreadPoolExecutor(max_workers=len(tests)) as executor:
+        futures = [
+            executor.submit(_run_test, test_name, test_func, base_url)
+            for test_name, test_func in tests
+        ]
+        for (test_name, _), future in zip(tests, futures):
+            result, lines = future.result()
+            for line in lines:
+                print(line)
             results.append((test_name, result))
-        except Exception as e:
-            print(f"❌ {test_name} failed with exception: {str(e)}")
-            results.append((test_name, False))
     
     # Summary
     print("\n" + "=" * 50)
@@ -225,14 +355,13 @@ def run_all_tests(base_url="http://localhost:5000"):
 
 
 if __name__ == "__main__":
-    import sys
-    
     # Get base URL from command line or use default
     base_url = sys.argv[1] if len(sys.argv) > 1 else "http://localhost:5000"
     
-    # Wait a moment for service to start if needed
+    # Wait for service to start if needed
     print("⏳ Waiting for service to be ready...")
-    time.sleep(2)
+    if not wait_for_service(base_url):
+        print("⚠️  Service did not become ready, running tests anyway")
     
     # Run tests
     success = run_all_tests(base_url)
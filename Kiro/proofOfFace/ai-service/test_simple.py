@@ -9,6 +9,10 @@ sys.path.insert(0, '.')
 from utils.face_processor_mock import create_mock_face_processor
 import numpy as np
 
+# Pre-generated embeddings, indexed instead of sampled on every use
+VALID_EMB_POOL = np.random.default_rng(0).standard_normal((16, 128))
+VALID_EMB_POOL.setflags(write=False)
+
 def main():
     print("Testing mock face processor...")
     
@@ -17,7 +21,7 @@ def main():
     print("✅ Processor created")
     
     # Test validation
-    valid_embedding = np.random.randn(128).astype(np.float64)
+    valid_embedding = VALID_EMB_POOL[0]
     is_valid = processor.validate_face_encoding(valid_embedding)
     print(f"✅ Validation test: {is_valid}")
     
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Unit tests for EncryptionManager and SecureStorage
+Tests Fernet encryption of face encodings and structured data
+"""
+
+import unittest
+import numpy as np
+import sys
+import os
+import json
+import base64
+import io
+import threading
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cryptography.fernet import Fernet
+from utils.encryption import (
+    EncryptionManager,
+    SecureStorage,
+    generate_encryption_key,
+    encrypt_face_encoding,
+    decrypt_face_encoding,
+    _manager_for
+)
+
+
+class TestEncryptionManager(unittest.TestCase):
+    """Test cases for EncryptionManager class"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """Set up test fixtures"""
+        cls.manager = EncryptionManager()
+        cls.rng = np.random.default_rng(0)
+        cls.face_encoding = cls.rng.standard_normal(128)
+    
+    def test_face_encoding_roundtrip(self):
+        """Test face encodings decrypt bit-exactly with dtype and shape"""
+        encrypted = self.manager.encrypt_face_encoding(self.face_encoding)
+        decrypted = self.manager.decrypt_face_encoding(encrypted)
+        
+        self.assertEqual(decrypted.dtype, np.float64)
+        np.testing.assert_array_equal(decrypted, self.face_encoding)
+    
+    def test_quantized_face_encoding(self):
+        """Test int8 quantization is compact and accurate to half a step"""
+        encrypted = self.manager.encrypt_face_encoding(self.face_encoding, quantize=True)
+        decrypted = self.manager.decrypt_face_encoding(encrypted)
+        
+        self.assertEqual(decrypted.dtype, np.float32)
+        step = np.abs(self.face_encoding).max() / 127
+        np.testing.assert_allclose(decrypted, self.face_encoding, rtol=0, atol=step / 2 + 1e-6)
+        
+        payload = self.manager.fernet.decrypt(encrypted.encode('ascii'))
+        self.assertLess(len(payload), 128 + 32)
+        
+        # All-zero encodings don't divide by zero
+        zeros = self.manager.decrypt_face_encoding(
+            self.manager.encrypt_face_encoding(np.zeros(128), quantize=True))
+        np.testing.assert_array_equal(zeros, np.zeros(128))
+    
+    def test_decrypt_face_encoding_rejects_foreign_tokens(self):
+        """Test the numpy fast path still raises ValueError on bad tokens"""
+        foreign = EncryptionManager().encrypt_face_encoding(self.face_encoding)
+        with self.assertRaises(ValueError):
+            self.manager.decrypt_face_encoding(foreign)
+        with self.assertRaises(ValueError):
+            self.manager.decrypt_face_encoding("gAAAAAnot-a-token")
+    
+    def test_ndarray_dtypes_and_shapes(self):
+        """Test fixed-width arrays of other dtypes and shapes roundtrip in binary form"""
+        arrays = [
+            self.rng.integers(-1000, 1000, (4, 32), dtype=np.int32),
+            self.rng.standard_normal((2, 3, 4)).astype(np.float32),
+            np.array([True, False, True]),
+            np.arange(6, dtype='>u2').reshape(2, 3),  # Big-endian input
+            np.zeros((0, 128)),
+            np.array(['alice', 'bob']),
+            np.array([b'\x00\x01', b'ab']),
+            np.array(['2024-01-01T00:00:00', 'NaT'], dtype='datetime64[s]'),
+        ]
+        
+        for array in arrays:
+            with self.subTest(dtype=array.dtype.str, shape=array.shape):
+                decrypted = self.manager.decrypt_data(self.manager.encrypt_data(array), data_type='numpy')
+                self.assertEqual(decrypted.shape, array.shape)
+                self.assertEqual(decrypted.dtype, array.dtype.newbyteorder('<'))
+                np.testing.assert_array_equal(decrypted, array)
+                
+                # Auto-detection recognizes packed arrays too
+                auto = self.manager.decrypt_data(self.manager.encrypt_data(array))
+                np.testing.assert_array_equal(auto, array)
+                
+                payload = self.manager.fernet.decrypt(self.manager.encrypt_data(array).encode('ascii'))
+                self.assertTrue(payload.startswith(b"\x93N"))
+    
+    def test_binary_packing_is_compact(self):
+        """Test the packed payload is far smaller than the legacy JSON form"""
+        packed = self.manager.fernet.decrypt(
+            self.manager.encrypt_face_encoding(self.face_encoding).encode('ascii'))
+        legacy = json.dumps({'array_data': self.face_encoding.tolist(),
+                             'dtype': 'float64', 'shape': [128]}).encode('utf-8')
+        
+        self.assertLess(len(packed), 128 * 8 + 32)
+        self.assertLess(len(packed) * 2, len(legacy))
+    
+    def test_legacy_json_array_still_decrypts(self):
+        """Test arrays stored in the legacy JSON format remain readable"""
+        legacy = json.dumps({'array_data': self.face_encoding.tolist(),
+                             'dtype': 'float64', 'shape': [128]}).encode('utf-8')
+        token = base64.b64encode(self.manager.fernet.encrypt(legacy)).decode('utf-8')
+        
+        np.testing.assert_array_equal(self.manager.decrypt_face_encoding(token), self.face_encoding)
+        np.testing.assert_array_equal(self.manager.decrypt_data(token), self.face_encoding)
+    
+    def test_dict_with_numpy_values(self):
+        """Test dicts holding numpy values and datetimes serialize as JSON"""
+        data = {
+            'embedding': np.arange(3, dtype=np.float32),
+            'count': np.int64(7),
+            'created': np.datetime64('2024-01-02T03:04:05'),
+            'nested': {'ok': True},
+        }
+        
+        decrypted = self.manager.decrypt_json(self.manager.encrypt_json(data))
+        self.assertEqual(decrypted, {
+            'embedding': [0.0, 1.0, 2.0],
+            'count': 7,
+            'created': '2024-01-02T03:04:05',
+            'nested': {'ok': True},
+        })
+    
+    def test_fast_paths_match_encrypt_data(self):
+        """Test encrypt_bytes and encrypt_ndarray decrypt like encrypt_data tokens"""
+        self.assertEqual(self.manager.decrypt_data(self.manager.encrypt_bytes(b"raw"), 'bytes'), b"raw")
+        
+        array = self.rng.standard_normal((4, 8)).astype(np.float32)
+        decrypted = self.manager.decrypt_data(self.manager.encrypt_ndarray(array), 'numpy')
+        np.testing.assert_array_equal(decrypted, array)
+        self.assertEqual(decrypted.dtype, np.float32)
+    
+    def test_encoder_dispatch(self):
+        """Test subclasses resolve through the MRO and new types can be registered"""
+        class Tag(str):
+            pass
+        
+        self.assertEqual(self.manager.decrypt_data(self.manager.encrypt_data(Tag("tagged"))), "tagged")
+        with self.assertRaises(ValueError):
+            self.manager.encrypt_data(3.14)
+        
+        EncryptionManager.register_encoder(complex, lambda manager, data: repr(data).encode())
+        self.addCleanup(EncryptionManager._ENCODERS.pop, complex)
+        token = self.manager.encrypt_data(1 + 2j)
+        self.assertEqual(self.manager.decrypt_data(token, 'bytes'), b"(1+2j)")
+    
+    def test_tokens_are_single_encoded(self):
+        """Test encrypt_data returns the Fernet token without an extra base64 layer"""
+        encrypted = self.manager.encrypt_data("hello")
+        self.assertTrue(encrypted.startswith("gAAAAA"))
+        self.assertEqual(self.manager.fernet.decrypt(encrypted.encode('ascii')), b"hello")
+        
+        # Legacy double-encoded tokens still decrypt
+        legacy = base64.b64encode(encrypted.encode('ascii')).decode('utf-8')
+        self.assertEqual(self.manager.decrypt_data(legacy, data_type='string'), "hello")
+        
+        # Stored legacy tokens migrate to the bare token
+        self.assertEqual(self.manager.unwrap_legacy_token(legacy), encrypted)
+        self.assertEqual(self.manager.unwrap_legacy_token(encrypted), encrypted)
+        with self.assertRaises(ValueError):
+            EncryptionManager().unwrap_legacy_token(legacy)
+    
+    def test_other_data_types_roundtrip(self):
+        """Test strings, bytes and dicts are unaffected by array packing"""
+        cases = [
+            ("string", "hello", 'string'),
+            ("bytes", b"\x00\x01binary", 'bytes'),
+            ("dict", {"user": "alice", "score": 0.93}, 'dict'),
+        ]
+        
+        for name, data, data_type in cases:
+            with self.subTest(case=name):
+                encrypted = self.manager.encrypt_data(data)
+                self.assertEqual(self.manager.decrypt_data(encrypted, data_type=data_type), data)
+
+    
+    def test_from_password_key_derivation(self):
+        """Test password-derived managers are reproducible from password and salt"""
+        salt = b"\x01" * 16
+        
+        for kdf in ('pbkdf2', 'scrypt'):
+            with self.subTest(kdf=kdf):
+                manager = EncryptionManager.from_password("pw", salt, iterations=1000, kdf=kdf)
+                again = EncryptionManager.from_password("pw", salt, iterations=1000, kdf=kdf)
+                self.assertEqual(manager.get_key(), again.get_key())
+                self.assertEqual(again.decrypt_data(manager.encrypt_data("secret")), "secret")
+        
+        # The work factor is part of the key
+        fewer = EncryptionManager.from_password("pw", salt, iterations=999)
+        self.assertNotEqual(fewer.get_key(), EncryptionManager.from_password("pw", salt, iterations=1000).get_key())
+        
+        self.assertEqual(EncryptionManager.PBKDF2_ITERATIONS, 600000)
+        with self.assertRaises(ValueError):
+            EncryptionManager.from_password("pw", salt, kdf='md5')
+    
+    def test_calibrate_iterations(self):
+        """Test calibration scales with the time budget and respects the floor"""
+        iterations = EncryptionManager.calibrate_iterations(target_ms=50, probe_iterations=1000)
+        self.assertIsInstance(iterations, int)
+        self.assertGreaterEqual(iterations, EncryptionManager.LEGACY_PBKDF2_ITERATIONS)
+    
+    def test_invalid_keys_rejected(self):
+        """Test malformed keys raise ValueError before Fernet is built"""
+        for key in ["not a key", "A" * 44, base64.urlsafe_b64encode(b"k" * 16).decode(), "!" * 44]:
+            with self.subTest(key=key), self.assertRaises(ValueError):
+                EncryptionManager(key)
+    
+    def test_npy_array_format(self):
+        """Test NPY payloads are standard .npy bytes and decrypt with either format"""
+        npy_manager = EncryptionManager(self.manager.get_key(), array_format='npy')
+        token = npy_manager.encrypt_face_encoding(self.face_encoding)
+        
+        payload = self.manager.fernet.decrypt(token.encode('ascii'))
+        np.testing.assert_array_equal(np.load(io.BytesIO(payload)), self.face_encoding)
+        
+        # Both managers read both formats
+        np.testing.assert_array_equal(self.manager.decrypt_face_encoding(token), self.face_encoding)
+        np.testing.assert_array_equal(self.manager.decrypt_data(token), self.face_encoding)
+        packed = self.manager.encrypt_face_encoding(self.face_encoding)
+        np.testing.assert_array_equal(npy_manager.decrypt_face_encoding(packed), self.face_encoding)
+        
+        with self.assertRaises(ValueError):
+            EncryptionManager(array_format='pickle')
+    
+    def test_aead_ciphers(self):
+        """Test AEAD ciphers roundtrip, are smaller than Fernet and reject other tokens"""
+        key = self.manager.get_key()
+        fernet_token = self.manager.encrypt_face_encoding(self.face_encoding)
+        
+        for cipher in ('chacha20poly1305', 'aes256gcm'):
+            with self.subTest(cipher=cipher):
+                manager = EncryptionManager(key, cipher=cipher)
+                token = manager.encrypt_face_encoding(self.face_encoding)
+                np.testing.assert_array_equal(manager.decrypt_face_encoding(token), self.face_encoding)
+                self.assertEqual(manager.decrypt_data(manager.encrypt_data({'a': 1})), {'a': 1})
+                self.assertLess(len(token), len(fernet_token))
+                
+                # Tokens of other ciphers, or tampered tokens, do not decrypt
+                with self.assertRaises(ValueError):
+                    manager.decrypt_face_encoding(fernet_token)
+                with self.assertRaises(ValueError):
+                    self.manager.decrypt_face_encoding(token)
+                tampered = token[:-4] + ('AAAA' if token[-4:] != 'AAAA' else 'BBBB')
+                with self.assertRaises(ValueError):
+                    manager.decrypt_face_encoding(tampered)
+        
+        # AEAD managers read each other's tokens, so 'auto' is portable across hosts
+        chacha_token = EncryptionManager(key, cipher='chacha20poly1305').encrypt_face_encoding(self.face_encoding)
+        auto = EncryptionManager(key, cipher='auto')
+        self.assertIn(auto.cipher, ('chacha20poly1305', 'aes256gcm'))
+        for manager in (auto, EncryptionManager(key, cipher='aes256gcm')):
+            np.testing.assert_array_equal(manager.decrypt_face_encoding(chacha_token), self.face_encoding)
+        
+        with self.assertRaises(ValueError):
+            EncryptionManager(key, cipher='rot13')
+    
+    def test_encrypt_stream(self):
+        """Test streamed pieces join into a standard Fernet token"""
+        data = self.rng.integers(0, 256, 200_001, dtype=np.uint8).tobytes()
+        chunks = (data[i:i + 7_777] for i in range(0, len(data), 7_777))
+        
+        pieces = list(self.manager.encrypt_stream(chunks, chunk_size=16 * 1024))
+        self.assertGreater(len(pieces), 10)
+        self.assertTrue(all(len(piece) <= 16 * 1024 * 4 // 3 for piece in pieces[:-1]))
+        
+        token = ''.join(pieces)
+        self.assertEqual(Fernet(self.manager.key).decrypt(token.encode('ascii')), data)
+        self.assertEqual(self.manager.decrypt_data(token, 'bytes'), data)
+        
+        # Empty streams still produce a valid token
+        self.assertEqual(self.manager.decrypt_data(''.join(self.manager.encrypt_stream([])), 'bytes'), b"")
+    
+    def test_fernet_tokens_interoperate(self):
+        """Test tokens from the selected Fernet backend open with cryptography's Fernet"""
+        token = self.manager.fernet.encrypt(b"payload")
+        self.assertEqual(Fernet(self.manager.key).decrypt(token), b"payload")
+        
+        other = EncryptionManager()
+        with self.assertRaises(ValueError):
+            other.decrypt_data(self.manager.encrypt_data("secret"))
+
+
+class TestSecureStorage(unittest.TestCase):
+    """Test SecureStorage"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.storage = SecureStorage(EncryptionManager(), num_shards=5)
+        self.face_encoding = np.random.default_rng(2).standard_normal(128)
+    
+    def test_store_retrieve_delete(self):
+        """Test the store, retrieve, list and delete lifecycle"""
+        self.assertTrue(self.storage.store_face_encoding("alice", self.face_encoding, {'source': 'test'}))
+        np.testing.assert_array_equal(self.storage.retrieve_face_encoding("alice"), self.face_encoding)
+        self.assertEqual(self.storage.list_identifiers(), ["alice"])
+        self.assertEqual(len(self.storage.get_timestamp("alice")), len("2024-01-01T00:00:00"))
+        stored_ns = self.storage.get_timestamp_ns("alice")
+        self.assertEqual(self.storage.get_timestamp("alice"), str(np.datetime64(stored_ns // 10**9, 's')))
+        
+        self.assertTrue(self.storage.delete_face_encoding("alice"))
+        self.assertFalse(self.storage.delete_face_encoding("alice"))
+        self.assertIsNone(self.storage.retrieve_face_encoding("alice"))
+        self.assertIsNone(self.storage.get_timestamp("alice"))
+        self.assertIsNone(self.storage.get_timestamp_ns("alice"))
+    
+    def test_store_batch(self):
+        """Test batch storage matches per-row storage and rejects bad shapes"""
+        gallery = np.random.default_rng(3).standard_normal((10, 128))
+        identifiers = [f"user-{i}" for i in range(10)]
+        
+        self.assertTrue(self.storage.store_face_encodings_batch(identifiers, gallery))
+        self.assertEqual(sorted(self.storage.list_identifiers()), sorted(identifiers))
+        for identifier, row in zip(identifiers, gallery):
+            np.testing.assert_array_equal(self.storage.retrieve_face_encoding(identifier), row)
+        
+        # Nothing is stored when the batch is malformed
+        self.assertFalse(self.storage.store_face_encodings_batch(["x", "y"], gallery))
+        self.assertFalse(self.storage.store_face_encodings_batch(["x"], gallery[0]))
+        self.assertEqual(len(self.storage.list_identifiers()), 10)
+    
+    def test_store_bulk(self):
+        """Test bulk storage encrypts one block and retrieves rows from it"""
+        gallery = np.random.default_rng(4).standard_normal((10, 128))
+        identifiers = [f"user-{i}" for i in range(10)]
+        
+        self.assertTrue(self.storage.store_face_encodings_bulk(identifiers, gallery, [{'row': i} for i in range(10)]))
+        self.assertEqual(sorted(self.storage.list_identifiers()), sorted(identifiers))
+        for identifier, row in zip(identifiers, gallery):
+            decrypted = self.storage.retrieve_face_encoding(identifier)
+            self.assertEqual(decrypted.dtype, np.float32)
+            np.testing.assert_array_equal(decrypted, row.astype(np.float32))
+        
+        # Deleting one row leaves the others retrievable
+        self.assertTrue(self.storage.delete_face_encoding("user-3"))
+        self.assertIsNone(self.storage.retrieve_face_encoding("user-3"))
+        np.testing.assert_array_equal(self.storage.retrieve_face_encoding("user-4"), gallery[4].astype(np.float32))
+        
+        self.assertFalse(self.storage.store_face_encodings_bulk(["x", "y"], gallery))
+    
+    def test_concurrent_stores(self):
+        """Test stores from many threads all land across the shards"""
+        # 5 shards round up to 8
+        self.assertEqual(len(self.storage._shards), 8)
+        
+        def store(worker):
+            for i in range(25):
+                self.storage.store_face_encoding(f"user-{worker}-{i}", self.face_encoding)
+        
+        threads = [threading.Thread(target=store, args=(worker,)) for worker in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(len(self.storage.list_identifiers()), 200)
+        np.testing.assert_array_equal(self.storage.retrieve_face_encoding("user-7-24"), self.face_encoding)
+
+
+class TestUtilityFunctions(unittest.TestCase):
+    """Test module-level convenience functions"""
+    
+    def test_face_encoding_convenience_functions(self):
+        """Test the convenience functions roundtrip and reuse one manager per key"""
+        key = generate_encryption_key()
+        face_encoding = np.random.default_rng(1).standard_normal(128)
+        
+        encrypted = encrypt_face_encoding(face_encoding, key)
+        np.testing.assert_array_equal(decrypt_face_encoding(encrypted, key), face_encoding)
+        self.assertIs(_manager_for(key), _manager_for(key))
+        
+        # Invalid keys are still rejected
+        with self.assertRaises(ValueError):
+            encrypt_face_encoding(face_encoding, "not a key")
+
+
+if __name__ == '__main__':
+    # Run the tests
+    unittest.main(verbosity=2)
@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the face_recognition-backed FaceProcessor
+
+Only the parts that need no dlib models run here; the rest of the
+pipeline is exercised through MockFaceProcessor.
+"""
+
+import unittest
+import numpy as np
+import sys
+import os
+import io
+import hashlib
+import threading
+import gc
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageOps
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.face_processor import (
+    FaceProcessor,
+    DEFAULT_YUNET_MODEL_PATH,
+    _dlib_cuda_device_count,
+    _EncodingBatcher
+)
+
+
+class TestFaceDetectorSelection(unittest.TestCase):
+    """Test detector configuration and YuNet output handling"""
+
+    def test_auto_detector_falls_back_to_dlib(self):
+        """Test 'auto' picks dlib when no YuNet model is available"""
+        processor = FaceProcessor(yunet_model_path="/non/existent/yunet.onnx")
+        self.assertEqual(processor.detector, 'dlib')
+
+        with self.assertRaises(ValueError):
+            FaceProcessor(detector='yunet', yunet_model_path="/non/existent/yunet.onnx")
+        with self.assertRaises(ValueError):
+            FaceProcessor(detector='mtcnn')
+
+    def test_device_selection(self):
+        """Test 'auto' uses a GPU only when dlib has CUDA devices"""
+        processor = FaceProcessor()
+        if _dlib_cuda_device_count():
+            self.assertEqual((processor.device, processor.cuda_device), ('cuda', 0))
+        else:
+            self.assertEqual((processor.device, processor.cuda_device), ('cpu', None))
+            with self.assertRaises(ValueError):
+                FaceProcessor(device='cuda')
+
+        with self.assertRaises(ValueError):
+            FaceProcessor(device='cuda:99')
+        with self.assertRaises(ValueError):
+            FaceProcessor(device='tpu')
+
+    def test_yunet_to_locations(self):
+        """Test YuNet boxes become clipped (top, right, bottom, left) tuples"""
+        faces = np.zeros((3, 15), dtype=np.float32)
+        faces[0, :4] = [10.4, 20.6, 100, 120]   # Inside the image
+        faces[1, :4] = [-5, -8, 50, 60]         # Partly outside, clipped
+        faces[2, :4] = [700, 700, 10, 10]       # Entirely outside, dropped
+
+        locations = FaceProcessor._yunet_to_locations(faces, width=640, height=480)
+
+        self.assertEqual(locations, [(21, 110, 141, 10), (0, 45, 52, 0)])
+        self.assertEqual(FaceProcessor._yunet_to_locations(None, 640, 480), [])
+
+    @unittest.skipUnless(os.path.exists(DEFAULT_YUNET_MODEL_PATH), "YuNet model not available")
+    def test_yunet_detects_nothing_in_blank_image(self):
+        """Test the YuNet path runs end to end on a blank image"""
+        processor = FaceProcessor(detector='yunet')
+        self.assertEqual(processor._locate_faces(np.zeros((240, 320, 3), dtype=np.uint8)), [])
+
+
+class TestPreprocessImage(unittest.TestCase):
+    """Test preprocess_image decoding and downscaling"""
+
+    def test_large_images_are_downscaled(self):
+        """Test oversized images fit 1920px, keep their aspect and look like a LANCZOS thumbnail"""
+        x = np.linspace(0, 255, 2400)
+        y = np.linspace(0, 255, 1200)[:, None]
+        pixels = np.stack([np.broadcast_to(x, (1200, 2400)), np.broadcast_to(y, (1200, 2400)),
+                           np.broadcast_to((x + y) / 2, (1200, 2400))], axis=2).astype(np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).save(buffer, format='PNG')
+
+        image_array = FaceProcessor().preprocess_image(buffer.getvalue())
+
+        self.assertEqual(image_array.shape, (960, 1920, 3))
+        self.assertTrue(image_array.flags.writeable)
+        reference = Image.fromarray(pixels)
+        reference.thumbnail((1920, 1920), Image.Resampling.LANCZOS)
+        self.assertLess(np.abs(image_array.astype(int) - np.asarray(reference).astype(int)).mean(), 1.0)
+
+    def test_large_jpegs_decode_at_reduced_scale(self):
+        """Test 4000px JPEGs use libjpeg's scaled decode and still honour EXIF orientation"""
+        x = np.linspace(0, 255, 4000)
+        y = np.linspace(0, 255, 2000)[:, None]
+        pixels = np.stack([np.broadcast_to(x, (2000, 4000)), np.broadcast_to(y, (2000, 4000)),
+                           np.broadcast_to((x + y) / 2, (2000, 4000))], axis=2).astype(np.uint8)
+        image = Image.fromarray(pixels)
+        exif = image.getexif()
+        exif[0x0112] = 6  # Rotate 90 degrees clockwise
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=90, exif=exif)
+
+        with self.assertLogs('utils.face_processor', level='DEBUG') as logs:
+            image_array = FaceProcessor().preprocess_image(buffer.getvalue())
+
+        self.assertTrue(any("1/2 scale" in line for line in logs.output))
+        self.assertEqual(image_array.shape, (1920, 960, 3))
+        reference = ImageOps.exif_transpose(Image.open(io.BytesIO(buffer.getvalue())).convert('RGB'))
+        reference.thumbnail((1920, 1920))
+        self.assertLess(np.abs(image_array.astype(int) - np.asarray(reference).astype(int)).mean(), 1.0)
+
+    def test_small_images_are_unchanged(self):
+        """Test images within bounds come back pixel for pixel"""
+        pixels = np.random.default_rng(9).integers(0, 256, (30, 50, 3), dtype=np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).save(buffer, format='PNG')
+
+        image_array = FaceProcessor().preprocess_image(buffer.getvalue())
+        np.testing.assert_array_equal(image_array, pixels)
+        self.assertTrue(image_array.flags.writeable)
+
+
+class TestPreprocessCache(unittest.TestCase):
+    """Test the opt-in preprocessed image cache"""
+
+    @staticmethod
+    def _png(seed):
+        """Encode a random RGB image as PNG bytes"""
+        pixels = np.random.default_rng(seed).integers(0, 256, (40, 60, 3), dtype=np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    def test_cache_hits_return_independent_copies(self):
+        """Test repeated uploads hit the cache and callers cannot corrupt it"""
+        processor = FaceProcessor(preprocess_cache_size=2)
+        image_data = self._png(0)
+
+        first = processor.preprocess_image(image_data)
+        first[:] = 0  # Caller mutates its array
+        second = processor.preprocess_image(image_data)
+
+        np.testing.assert_array_equal(second, FaceProcessor().preprocess_image(image_data))
+        self.assertTrue(second.flags.writeable)
+        self.assertEqual(len(processor._preprocess_cache), 1)
+
+    def test_cache_is_bounded_and_off_by_default(self):
+        """Test least recently used entries are evicted; failures are not cached"""
+        processor = FaceProcessor(preprocess_cache_size=2)
+        for seed in range(4):
+            processor.preprocess_image(self._png(seed))
+        self.assertIsNone(processor.preprocess_image(b"not an image"))
+        self.assertEqual(len(processor._preprocess_cache), 2)
+
+        self.assertIsNone(FaceProcessor()._preprocess_cache)
+
+
+class TestImageQuality(unittest.TestCase):
+    """Test assess_image_quality"""
+
+    def test_matches_reference_statistics(self):
+        """Test the single-pass statistics match the numpy reference"""
+        import cv2
+        processor = FaceProcessor()
+        rng = np.random.default_rng(5)
+
+        for image in (rng.integers(0, 256, (120, 160, 3), dtype=np.uint8),
+                      np.full((50, 50, 3), 90, dtype=np.uint8),
+                      np.tile(np.arange(0, 256, 4, dtype=np.uint8), (64, 1))[..., None].repeat(3, axis=2)):
+            gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+            sharpness = min(cv2.Laplacian(gray, cv2.CV_64F).var() / 1000.0, 1.0)
+            brightness = 1.0 - abs(np.mean(gray) / 255.0 - 0.5) * 2
+            contrast = min(np.std(gray) / 255.0 * 4, 1.0)
+            expected = sharpness * 0.5 + brightness * 0.3 + contrast * 0.2
+
+            self.assertAlmostEqual(processor.assess_image_quality(image), expected, places=9)
+
+
+class TestBiometricHash(unittest.TestCase):
+    """Test generate_biometric_hash serialization formats"""
+
+    def setUp(self):
+        """Set up a random encoding"""
+        self.encoding = np.random.default_rng(6).standard_normal(128)
+
+    def test_float64_format_is_unchanged(self):
+        """Test the default hash is SHA-256 of the rounded unit vector"""
+        normalized = self.encoding / np.linalg.norm(self.encoding)
+        expected = hashlib.sha256(np.round(normalized, decimals=6).tobytes()).hexdigest()
+        self.assertEqual(FaceProcessor().generate_biometric_hash(self.encoding), expected)
+
+    def test_int8_format(self):
+        """Test int8 hashes are deterministic, scale-invariant and distinct from float64"""
+        processor = FaceProcessor(hash_format='int8')
+        normalized = self.encoding / np.linalg.norm(self.encoding)
+        expected = hashlib.sha256(np.rint(normalized * 127).astype(np.int8).tobytes()).hexdigest()
+
+        self.assertEqual(processor.generate_biometric_hash(self.encoding), expected)
+        self.assertEqual(processor.generate_biometric_hash(self.encoding * 3), expected)
+        self.assertNotEqual(expected, FaceProcessor().generate_biometric_hash(self.encoding))
+
+        with self.assertRaises(ValueError):
+            FaceProcessor(hash_format='float16')
+
+    def test_hash_algorithms(self):
+        """Test alternative digests hash the same bytes as SHA-256 does, behind a prefix"""
+        normalized = self.encoding / np.linalg.norm(self.encoding)
+        encoding_bytes = np.round(normalized, decimals=6).tobytes()
+
+        biometric_hash = FaceProcessor(hash_algorithm='blake2b').generate_biometric_hash(self.encoding)
+        self.assertEqual(biometric_hash, 'b2:' + hashlib.blake2b(encoding_bytes, digest_size=32).hexdigest())
+
+        try:
+            import blake3
+        except ImportError:
+            with self.assertRaises(ImportError):
+                FaceProcessor(hash_algorithm='blake3')
+        else:
+            biometric_hash = FaceProcessor(hash_algorithm='blake3').generate_biometric_hash(self.encoding)
+            self.assertEqual(biometric_hash, 'b3:' + blake3.blake3(encoding_bytes).hexdigest())
+
+        with self.assertRaises(ValueError):
+            FaceProcessor(hash_algorithm='md5')
+
+
+class TestCompareEmbeddingsBatch(unittest.TestCase):
+    """Test batched gallery comparison"""
+
+    def setUp(self):
+        """Set up a probe and a gallery containing it"""
+        rng = np.random.default_rng(7)
+        self.processor = FaceProcessor()
+        self.gallery = rng.standard_normal((50, 128)) * 0.1
+        self.probe = self.gallery[3] + rng.standard_normal(128) * 0.01
+
+    def test_distances_match_pairwise_norm(self):
+        """Test every distance equals the Euclidean norm of the difference"""
+        result = self.processor.compare_embeddings_batch(self.probe, self.gallery, threshold=0.5)
+
+        self.assertNotIn('error', result)
+        expected = np.linalg.norm(self.gallery - self.probe, axis=1)
+        np.testing.assert_allclose(result['distances'], expected, rtol=0, atol=1e-9)
+        np.testing.assert_array_equal(result['matches'], expected <= 0.5)
+        self.assertTrue(result['matches'][3])
+
+        # float32 galleries are compared in float32
+        result = self.processor.compare_embeddings_batch(self.probe, self.gallery.astype(np.float32))
+        self.assertEqual(result['distances'].dtype, np.float32)
+        np.testing.assert_allclose(result['distances'], expected, rtol=0, atol=1e-4)
+
+    def test_pairwise_comparison_agrees(self):
+        """Test compare_embeddings and compare_faces give the batch distances"""
+        batch = self.processor.compare_embeddings_batch(self.probe, self.gallery[:5], threshold=0.5)
+        for i in range(5):
+            pairwise = self.processor.compare_embeddings(self.gallery[i], self.probe, threshold=0.5)
+            self.assertNotIn('error', pairwise)
+            self.assertAlmostEqual(pairwise['distance'], batch['distances'][i], places=9)
+            self.assertEqual(pairwise['match'], bool(batch['matches'][i]))
+            self.assertAlmostEqual(self.processor.compare_faces(self.gallery[i], self.probe)['distance'],
+                                   pairwise['distance'], places=12)
+
+    def test_invalid_input(self):
+        """Test malformed galleries and probes are reported as errors"""
+        for probe, gallery in ((self.probe, self.gallery[:, :64]),
+                               (self.probe[:64], self.gallery),
+                               (self.probe, np.full((2, 128), np.nan))):
+            with self.subTest(probe=probe.shape, gallery=gallery.shape):
+                result = self.processor.compare_embeddings_batch(probe, gallery)
+                self.assertIn('error', result)
+                self.assertEqual(len(result['distances']), 0)
+
+
+class TestVideoFrames(unittest.TestCase):
+    """Test video frame sampling"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Write a short clip whose frame n is a flat image of value 5n"""
+        import cv2
+        import tempfile
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "clip.mp4")
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 30, (64, 48))
+            if not writer.isOpened():
+                raise unittest.SkipTest("OpenCV cannot encode mp4v video here")
+            for n in range(40):
+                writer.write(np.full((48, 64, 3), n * 5, dtype=np.uint8))
+            writer.release()
+            with open(path, 'rb') as f:
+                cls.video_data = f.read()
+
+    def test_samples_every_stride_frame(self):
+        """Test only every VIDEO_FRAME_STRIDE-th frame is decoded, in order"""
+        processor = FaceProcessor()
+        frames = list(processor._iter_video_frames(self.video_data))
+
+        stride = FaceProcessor.VIDEO_FRAME_STRIDE
+        expected_numbers = list(range(1, FaceProcessor.VIDEO_FRAMES_TO_CHECK + 1, stride))
+        self.assertEqual([number for number, _ in frames], expected_numbers)
+        for _, frame in frames:
+            self.assertEqual(frame.shape, (48, 64, 3))
+        # The clip brightens every frame, so distinct frames were decoded
+        means = [frame.mean() for _, frame in frames]
+        self.assertEqual(means, sorted(set(means)))
+
+    def test_unreadable_video_yields_nothing(self):
+        """Test garbage input produces no frames and no frame extraction"""
+        processor = FaceProcessor()
+        self.assertEqual(list(processor._iter_video_frames(b"\x00" * 1000)), [])
+        self.assertIsNone(processor._extract_frame_from_video(b"\x00" * 1000))
+
+
+class TestProcessImagesPipeline(unittest.TestCase):
+    """Test the threaded decode/detect/encode pipeline"""
+
+    @staticmethod
+    def _png(value):
+        """Encode a flat grey RGB image as PNG bytes"""
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 64), (value, value, value)).save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    def test_results_match_process_image_in_order(self):
+        """Test pipelined results equal sequential ones, in input order"""
+        processor = FaceProcessor()
+        inputs = [self._png(128), b"not an image", self._png(10), b"", self._png(200)] * 3
+
+        results = list(processor.process_images(iter(inputs), prefetch=2))
+
+        self.assertEqual(len(results), len(inputs))
+        for image_data, result in zip(inputs, results):
+            expected = processor.process_image(image_data)
+            self.assertEqual(result.success, expected.success)
+            self.assertEqual(result.error_message, expected.error_message)
+            self.assertEqual(result.image_quality_score, expected.image_quality_score)
+
+    def test_ready_detections_are_encoded_together(self):
+        """Test detections finished by the time a result is due share one batched encode"""
+        processor = FaceProcessor()
+        batch_sizes = []
+        detected = threading.Semaphore(0)
+
+        def locate_stage(image_array):
+            detected.release()
+            return image_array, [(0, 1, 1, 0)], 0.9, 0.0
+
+        def encode_faces_batch(images, locations):
+            batch_sizes.append(len(images))
+            return [[np.full(128, image[0, 0, 0] / 255.0)] for image in images]
+
+        # Shadow the detection and dlib stages on this instance only
+        processor._locate_stage = locate_stage
+        processor._encode_faces_batch = encode_faces_batch
+
+        def inputs():
+            for value in range(0, 240, 30):
+                yield self._png(value)
+            # Let every detection finish before the final results are due
+            for _ in range(8):
+                detected.acquire(timeout=5)
+
+        results = list(processor.process_images(inputs(), prefetch=16))
+
+        self.assertEqual([result.success for result in results], [True] * 8)
+        self.assertEqual([round(result.face_encodings[0][0] * 255) for result in results],
+                         list(range(0, 240, 30)))
+        self.assertEqual(batch_sizes, [8])
+
+
+class TestEncodingBatcher(unittest.TestCase):
+    """Test concurrent encoding requests are coalesced into batches"""
+
+    def test_concurrent_requests_share_batches(self):
+        """Test every caller gets its own result and calls are batched"""
+        batch_sizes = []
+        release = threading.Event()
+
+        def encode_batch(images, locations):
+            release.wait(5)
+            batch_sizes.append(len(images))
+            return [[image.sum() + len(locs)] for image, locs in zip(images, locations)]
+
+        batcher = _EncodingBatcher(encode_batch, max_batch=4, max_wait=0.5)
+        images = [np.full((2, 2, 3), i, dtype=np.uint8) for i in range(8)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [executor.submit(batcher.submit, image, [(0, 1, 1, 0)]) for image in images]
+            release.set()
+            results = [future.result(timeout=10) for future in futures]
+
+        self.assertEqual(results, [[image.sum() + 1] for image in images])
+        self.assertEqual(sum(batch_sizes), 8)
+        self.assertLess(len(batch_sizes), 8)
+        self.assertLessEqual(max(batch_sizes), 4)
+
+    def test_errors_reach_every_caller(self):
+        """Test a failing batch raises in each waiting caller"""
+        def encode_batch(images, locations):
+            raise RuntimeError("model failure")
+
+        batcher = _EncodingBatcher(encode_batch, max_batch=2, max_wait=0.01)
+        with self.assertRaises(RuntimeError):
+            batcher.submit(np.zeros((2, 2, 3), dtype=np.uint8), [])
+
+        with self.assertRaises(ValueError):
+            FaceProcessor(batch_size=0)
+
+    def test_short_results_fail_leftover_callers(self):
+        """Test callers without a result get an error instead of hanging"""
+        release = threading.Event()
+
+        def encode_batch(images, locations):
+            release.wait(5)
+            return [["first"]]
+
+        batcher = _EncodingBatcher(encode_batch, max_batch=2, max_wait=0.5)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(batcher.submit, np.zeros((2, 2, 3), dtype=np.uint8), [])
+                       for _ in range(2)]
+            release.set()
+            outcomes = []
+            for future in futures:
+                try:
+                    outcomes.append(future.result(timeout=10))
+                except RuntimeError:
+                    outcomes.append(None)
+
+        self.assertEqual(sorted(outcomes, key=str), [None, ["first"]])
+        batcher.close()
+
+    def test_close_stops_worker(self):
+        """Test close() ends the worker thread and later submits fail"""
+        batcher = _EncodingBatcher(lambda images, locations: [[]] * len(images), max_batch=2, max_wait=0.01)
+        self.assertEqual(batcher.submit(np.zeros((2, 2, 3), dtype=np.uint8), []), [])
+
+        batcher.close()
+        batcher._worker.join(timeout=5)
+        self.assertFalse(batcher._worker.is_alive())
+        with self.assertRaises(RuntimeError):
+            batcher.submit(np.zeros((2, 2, 3), dtype=np.uint8), [])
+
+    def test_unused_processor_releases_worker(self):
+        """Test a batching processor is collected and its worker exits"""
+        processor = FaceProcessor(batch_size=4)
+        worker = processor._batcher._worker
+        del processor
+        gc.collect()
+
+        worker.join(timeout=5)
+        self.assertFalse(worker.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Unit tests for FaceGalleryIndex
+"""
+
+import unittest
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.gallery_index import FaceGalleryIndex, faiss
+
+
+class TestFaceGalleryIndex(unittest.TestCase):
+    """Test gallery search"""
+
+    def setUp(self):
+        """Set up a random gallery"""
+        self.rng = np.random.default_rng(8)
+        self.gallery = self.rng.standard_normal((2000, 128)).astype(np.float32) * 0.1
+        self.identifiers = [f"user-{i}" for i in range(len(self.gallery))]
+
+    def test_exact_search(self):
+        """Test exact search returns the true nearest faces in order"""
+        index = FaceGalleryIndex()
+        index.add(self.identifiers[:1000], self.gallery[:1000])
+        index.add(self.identifiers[1000:], self.gallery[1000:])
+        probe = self.gallery[42] + self.rng.standard_normal(128).astype(np.float32) * 0.01
+
+        results = index.search(probe, k=3)
+
+        distances = np.linalg.norm(self.gallery - probe, axis=1)
+        nearest = np.argsort(distances)[:3]
+        self.assertEqual([identifier for identifier, _ in results], [self.identifiers[i] for i in nearest])
+        np.testing.assert_allclose([distance for _, distance in results], distances[nearest], atol=1e-5)
+        self.assertEqual(results[0][0], "user-42")
+
+        # The threshold drops distant faces
+        self.assertEqual([identifier for identifier, _ in index.search(probe, k=3, threshold=0.5)], ["user-42"])
+
+    def test_invalid_input(self):
+        """Test bad shapes, empty galleries and unknown methods"""
+        index = FaceGalleryIndex()
+        self.assertEqual(index.search(self.gallery[0]), [])
+        with self.assertRaises(ValueError):
+            index.add(["a"], self.gallery[:1, :64])
+        with self.assertRaises(ValueError):
+            index.add(["a", "b"], self.gallery[:1])
+        with self.assertRaises(ValueError):
+            FaceGalleryIndex(method='hnsw')
+
+    @unittest.skipIf(faiss is None, "faiss not installed")
+    def test_pq_search_finds_near_duplicate(self):
+        """Test the PQ index finds a near-duplicate probe"""
+        index = FaceGalleryIndex(method='pq', m=16)
+        self.assertFalse(index.is_trained)
+        index.train(self.gallery)
+        index.add(self.identifiers, self.gallery)
+
+        probe = self.gallery[7] + self.rng.standard_normal(128).astype(np.float32) * 0.001
+        self.assertEqual(index.search(probe, k=1)[0][0], "user-7")
+
+    @unittest.skipIf(faiss is not None, "faiss installed")
+    def test_pq_requires_faiss(self):
+        """Test PQ methods fail clearly without faiss"""
+        with self.assertRaises(ImportError):
+            FaceGalleryIndex(method='ivfpq')
+
+
+if __name__ == '__main__':
+    unittest.main()
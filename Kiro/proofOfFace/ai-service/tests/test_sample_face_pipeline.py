@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+End-to-end tests of the mock face pipeline on generated sample faces
+
+Covers the checks of test_simple.py, test_embeddings_simple.py and
+test_with_sample_images.py with one processor and one image batch
+shared by the whole module.
+"""
+
+import unittest
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.face_processor_mock import create_mock_face_processor
+from test_with_sample_images import create_sample_face_batch, VALID_EMB_POOL
+
+# Shared across every test in this module (see setUpModule)
+PROCESSOR = None
+FACE_IMAGES = None
+EMBEDDINGS = None
+
+
+def setUpModule():
+    """Create the processor, sample faces and their embeddings once"""
+    global PROCESSOR, FACE_IMAGES, EMBEDDINGS
+    PROCESSOR = create_mock_face_processor(tolerance=0.6, model='small')
+    FACE_IMAGES = create_sample_face_batch([1, 2, 3])
+
+    results = [PROCESSOR.extract_embeddings(image) for image in FACE_IMAGES]
+    EMBEDDINGS = [np.asarray(result['embeddings'], dtype=np.float64)
+                  for result in results if result['success']]
+
+
+class TestSampleFacePipeline(unittest.TestCase):
+    """Test extraction, comparison and hashing on sample faces"""
+
+    def test_sample_batch_shape(self):
+        """Test the sample batch is one RGB image per face id"""
+        self.assertEqual(FACE_IMAGES.shape, (3, 400, 400, 3))
+        self.assertEqual(FACE_IMAGES.dtype, np.uint8)
+        self.assertFalse(np.array_equal(FACE_IMAGES[0], FACE_IMAGES[1]))
+
+    def test_extract_embeddings(self):
+        """Test every sample face yields a valid 128D embedding"""
+        self.assertEqual(len(EMBEDDINGS), 3)
+        for embedding in EMBEDDINGS:
+            self.assertEqual(embedding.shape, (128,))
+            self.assertTrue(PROCESSOR.validate_face_encoding(embedding))
+
+    def test_compare_sample_embeddings(self):
+        """Test self-comparison matches and batched comparison agrees"""
+        result = PROCESSOR.compare_embeddings(EMBEDDINGS[0], EMBEDDINGS[0])
+        self.assertTrue(result['match'])
+
+        batch = PROCESSOR.compare_embeddings_batch(EMBEDDINGS[0], np.stack(EMBEDDINGS))
+        self.assertNotIn('error', batch)
+        self.assertTrue(batch['matches'][0])
+
+        pairwise = PROCESSOR.compare_embeddings(EMBEDDINGS[0], EMBEDDINGS[1])
+        self.assertAlmostEqual(batch['distances'][1], pairwise['distance'], places=6)
+
+    def test_biometric_hash_is_stable(self):
+        """Test hashes are deterministic and distinct per face"""
+        hashes = [PROCESSOR.generate_biometric_hash(embedding) for embedding in EMBEDDINGS]
+        self.assertEqual(hashes[0], PROCESSOR.generate_biometric_hash(EMBEDDINGS[0]))
+        self.assertEqual(len(set(hashes)), len(hashes))
+
+    def test_error_handling(self):
+        """Test invalid inputs produce error results instead of raising"""
+        self.assertFalse(PROCESSOR.validate_face_encoding(VALID_EMB_POOL[0, :64]))
+
+        result = PROCESSOR.extract_embeddings(b"invalid image data")
+        self.assertFalse(result['success'])
+
+        result = PROCESSOR.extract_embeddings("/path/that/does/not/exist.jpg")
+        self.assertFalse(result['success'])
+
+        comparison = PROCESSOR.compare_embeddings(VALID_EMB_POOL[1], VALID_EMB_POOL[2, :64])
+        self.assertFalse(comparison['match'])
+        self.assertIn('error', comparison)
+
+
+if __name__ == '__main__':
+    unittest.main()
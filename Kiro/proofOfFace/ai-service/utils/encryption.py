@@ -3,29 +3,411 @@ Encryption utilities for ProofOfFace AI Service
 Handles encryption/decryption of sensitive data like face encodings and embeddings
 """
 
-import base64
+import binascii
+import hashlib
+import hmac
+import io
 import json
 import numpy as np
-import secrets
 import struct
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from cryptography.hazmat.primitives.ciphers.aead import AESGCM
-from cryptography.hazmat.backends import default_backend
-from typing import Union, Dict, Any, Optional, List
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+try:
+    from cryptography.hazmat.primitives.kdf.argon2 import Argon2id  # cryptography >= 44
+except ImportError:
+    Argon2id = None
+try:
+    from argon2.low_level import Type as Argon2Type, hash_secret_raw  # Optional argon2-cffi
+except ImportError:
+    hash_secret_raw = None
+from cryptography.hazmat.primitives import hashes, padding
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+from cryptography.exceptions import InvalidTag
+from typing import Union, Dict, Any, Optional, List, Iterable, Iterator
 import logging
 import os
+import threading
+import time
+
+try:
+    import pybase64 as base64  # SIMD base64 codec, same API as the stdlib module
+except ImportError:
+    import base64
+
+if hasattr(base64, 'b64encode_as_string'):
+    _b64encode = base64.b64encode_as_string
+    _b64decode = base64.b64decode
+else:
+    def _b64encode(data: bytes) -> str:
+        """Standard base64 straight to str, without the base64 module wrapper"""
+        return binascii.b2a_base64(data, newline=False).decode('ascii')
+    
+    _b64decode = binascii.a2b_base64  # Accepts ASCII str directly
+
+try:
+    import orjson  # Optional C JSON codec with native numpy support
+except ImportError:
+    orjson = None
+
+try:
+    import rfernet  # Optional Rust-backed Fernet, token-compatible
+except ImportError:
+    rfernet = None
 
 logger = logging.getLogger(__name__)
 
 
+class _RFernet:
+    """Adapter giving rfernet.Fernet the cryptography.fernet.Fernet interface"""
+    
+    def __init__(self, key: Union[str, bytes]):
+        self._fernet = rfernet.Fernet(key.decode() if isinstance(key, bytes) else key)
+    
+    def encrypt(self, data: bytes) -> bytes:
+        return self._fernet.encrypt(data)
+    
+    def decrypt(self, token: bytes) -> bytes:
+        try:
+            return self._fernet.decrypt(token)
+        except rfernet.DecryptionError:
+            raise InvalidToken
+
+
+def _select_fernet_impl():
+    """
+    Pick the Fernet implementation for EncryptionManager
+    
+    POF_FERNET_IMPL selects 'rfernet' or 'cryptography' explicitly for A/B
+    testing; by default rfernet is used when installed.
+    """
+    impl = os.environ.get('POF_FERNET_IMPL', 'auto').lower()
+    if impl not in ('auto', 'rfernet', 'cryptography'):
+        raise ValueError(f"Unsupported POF_FERNET_IMPL: {impl}")
+    
+    if impl != 'cryptography' and rfernet is not None:
+        return _RFernet
+    if impl == 'rfernet':
+        raise ImportError("POF_FERNET_IMPL=rfernet but rfernet is not installed")
+    return Fernet
+
+
+_FernetImpl = _select_fernet_impl()
+
+
+class _AEADToken:
+    """
+    Single-call AEAD with the Fernet encrypt/decrypt interface
+    
+    Tokens are url-safe base64 of version byte || 12-byte nonce || ciphertext
+    with tag; the version byte names the cipher and is authenticated as
+    associated data. Unlike Fernet there is no timestamp or separate HMAC.
+    Tokens of any AEAD version decrypt under the same key.
+    """
+    
+    NONCE_SIZE = 12
+    
+    def __init__(self, key: bytes, version: bytes, aead_class):
+        self._key = base64.urlsafe_b64decode(key)
+        self._aead = aead_class(self._key)
+        self._version = version
+        self._aeads = {version: self._aead}
+    
+    def encrypt(self, data: bytes) -> bytes:
+        nonce = _urandom(self.NONCE_SIZE)
+        return base64.urlsafe_b64encode(self._version + nonce + self._aead.encrypt(nonce, data, self._version))
+    
+    def decrypt(self, token: bytes) -> bytes:
+        try:
+            raw = base64.urlsafe_b64decode(token)
+        except ValueError:
+            raise InvalidToken
+        version = raw[:1]
+        aead = self._aeads.get(version)
+        if aead is None:
+            if version not in _AEAD_BY_VERSION:
+                raise InvalidToken
+            aead = self._aeads[version] = _AEAD_BY_VERSION[version](self._key)
+        nonce = raw[1:1 + self.NONCE_SIZE]
+        try:
+            return aead.decrypt(nonce, raw[1 + self.NONCE_SIZE:], version)
+        except (InvalidTag, ValueError):
+            raise InvalidToken
+
+
+# Token formats for EncryptionManager(cipher=...): AEAD version byte and class
+_AEAD_CIPHERS = {
+    'chacha20poly1305': (b"\x01", ChaCha20Poly1305),
+    'aes256gcm': (b"\x02", AESGCM),
+}
+_AEAD_BY_VERSION = {version: aead_class for version, aead_class in _AEAD_CIPHERS.values()}
+
+
+def _pbkdf2_sha256(password: bytes, salt: bytes, iterations: int, length: int) -> bytes:
+    """Run PBKDF2-HMAC-SHA256"""
+    return hashlib.pbkdf2_hmac('sha256', password, salt, iterations, length)
+
+
+# Argon2id comes from argon2-cffi, or from cryptography 44+ where installed
+ARGON2_AVAILABLE = hash_secret_raw is not None or Argon2id is not None
+
+
+def _argon2id(password: bytes, salt: bytes, time_cost: int, memory_cost: int, length: int) -> bytes:
+    """Run Argon2id with one lane; memory_cost is in KiB"""
+    if hash_secret_raw is not None:
+        return hash_secret_raw(password, salt, time_cost=time_cost, memory_cost=memory_cost,
+                               parallelism=1, hash_len=length, type=Argon2Type.ID)
+    return Argon2id(salt=salt, length=length, iterations=time_cost, lanes=1,
+                    memory_cost=memory_cost).derive(password)
+
+
+def _hkdf_sha256(secret: bytes, salt: bytes, info: bytes, length: int) -> bytes:
+    """Run HKDF-SHA256, a single extract-and-expand with no work factor"""
+    return HKDF(algorithm=hashes.SHA256(), length=length, salt=salt, info=info).derive(secret)
+
+
+@lru_cache(maxsize=128)
+def _aesgcm_for(key: bytes) -> AESGCM:
+    """
+    Return a shared AESGCM instance per key
+    
+    AESGCM objects are stateless between calls and safe to share, so the
+    key schedule is expanded once per key instead of once per record.
+    """
+    return AESGCM(key)
+
+
+@lru_cache(maxsize=128)
+def _chacha20poly1305_for(key: bytes) -> ChaCha20Poly1305:
+    """Return a shared ChaCha20Poly1305 instance per key (see _aesgcm_for)"""
+    return ChaCha20Poly1305(key)
+
+
+@lru_cache(maxsize=128)
+def _key_from_hex(key_hex: str) -> bytes:
+    """
+    Decode a 64-character hex key once per distinct key
+    
+    Raises:
+        ValueError: If the key is not valid hexadecimal
+    """
+    try:
+        return bytes.fromhex(key_hex)
+    except ValueError:
+        raise ValueError("Key must be valid hexadecimal")
+
+
+def _has_aes_instructions() -> bool:
+    """
+    Best-effort check for hardware AES (x86 AES-NI, ARMv8 crypto extensions)
+    
+    Reads the CPU flags from /proc/cpuinfo; where that is unavailable the
+    CPU is assumed to have them, which keeps AES-GCM as the choice.
+    """
+    try:
+        with open('/proc/cpuinfo') as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith(('flags', 'Features')):
+                    return 'aes' in line.split(':', 1)[1].split()
+    except OSError:
+        pass
+    return True
+
+
+_AES_INSTRUCTIONS = _has_aes_instructions()
+
+
+def _json_default(obj: Any) -> Any:
+    """Serialize values the JSON encoder doesn't handle natively"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.datetime64):
+        return str(obj)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _json_dumps(data: Any) -> bytes:
+    """Encode data as UTF-8 JSON, using orjson when installed"""
+    if orjson is not None:
+        return orjson.dumps(data, default=_json_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=_json_default).encode('utf-8')
+
+
+def _json_loads(data: bytes) -> Any:
+    """
+    Decode UTF-8 JSON, using orjson when installed
+    
+    Raises:
+        json.JSONDecodeError: If data is not valid JSON (orjson's error subclasses it)
+        UnicodeDecodeError: If data is not valid UTF-8 (stdlib fallback)
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data.decode('utf-8'))
+
+
+# Every Fernet token starts with version byte 0x80 and a 64-bit timestamp
+# whose high bytes are zero, i.e. "gAAAAA" once base64-encoded
+_FERNET_TOKEN_PREFIX = b"gAAAAA"
+
+# Magic prefix of binary-packed numpy payloads; 0x93 can never start UTF-8
+# text, so these payloads are distinguishable from JSON and strings
+_NDARRAY_MAGIC = b"\x93N"
+
+
+# CSPRNG for keys, salts and nonces; secrets.token_bytes is just a wrapper
+_urandom = os.urandom
+
+# Precompiled fixed struct layouts, parsed once instead of per call
+_U8 = struct.Struct("<B")
+_F64 = struct.Struct("<d")
+_EMBEDDING_STRUCT = struct.Struct("128d")  # Native doubles, the legacy record layout
+
+# dtype kinds _pack_ndarray round-trips exactly: numbers, datetimes and
+# fixed-width strings. Object and structured arrays fall back to JSON.
+_PACKABLE_KINDS = 'biufcmMSU'
+
+
+def _pack_ndarray(array: np.ndarray) -> bytes:
+    """
+    Pack a fixed-width numpy array as a small binary header plus its raw buffer
+    
+    Layout (little-endian): magic, dtype string length and dtype string
+    (e.g. '<f8'), ndim, one uint32 per dimension, then the array data.
+    """
+    dtype = array.dtype.newbyteorder('<')
+    dtype_str = dtype.str.encode('ascii')
+    header = struct.pack(f"<B{len(dtype_str)}sB{array.ndim}I",
+                         len(dtype_str), dtype_str, array.ndim, *array.shape)
+    return _NDARRAY_MAGIC + header + np.ascontiguousarray(array, dtype=dtype).tobytes()
+
+
+def _unpack_ndarray(payload: bytes) -> np.ndarray:
+    """
+    Rebuild a numpy array packed by _pack_ndarray
+    
+    Raises:
+        ValueError: If the payload is not a valid packed array
+    """
+    # Parse the header in place and copy the array body exactly once
+    view = memoryview(payload)
+    try:
+        offset = len(_NDARRAY_MAGIC)
+        (dtype_len,) = _U8.unpack_from(view, offset)
+        offset += 1
+        dtype = np.dtype(bytes(view[offset:offset + dtype_len]).decode('ascii'))
+        offset += dtype_len
+        (ndim,) = _U8.unpack_from(view, offset)
+        offset += 1
+        shape = struct.unpack_from(f"<{ndim}I", view, offset)
+        offset += 4 * ndim
+        return np.frombuffer(view, dtype=dtype, offset=offset).reshape(shape).copy()
+    except (struct.error, TypeError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid packed array: {str(e)}")
+
+
+# Magic prefix of int8-quantized face encodings (see _quantize)
+_QUANTIZED_MAGIC = b"\x93Q"
+
+
+def _quantize(vector: np.ndarray) -> tuple:
+    """
+    Quantize a vector to int8 with one symmetric per-vector scale
+    
+    Returns:
+        tuple: (int8 array, scale) with vector ~= int8 array * scale
+    """
+    peak = float(np.max(np.abs(vector))) if vector.size else 0.0
+    scale = peak / 127 if peak > 0 else 1.0
+    return np.round(vector / scale).astype(np.int8), scale
+
+
+def _pack_quantized(vector: np.ndarray) -> bytes:
+    """Pack an int8-quantized vector as magic, float64 scale and packed array"""
+    quantized, scale = _quantize(vector)
+    return _QUANTIZED_MAGIC + _F64.pack(scale) + _pack_ndarray(quantized)
+
+
+def _unpack_quantized(payload: bytes) -> np.ndarray:
+    """
+    Dequantize a payload packed by _pack_quantized to float32
+    
+    Raises:
+        ValueError: If the payload is not a valid quantized vector
+    """
+    offset = len(_QUANTIZED_MAGIC)
+    try:
+        (scale,) = _F64.unpack_from(payload, offset)
+    except struct.error as e:
+        raise ValueError(f"Invalid quantized array: {str(e)}")
+    quantized = _unpack_ndarray(memoryview(payload)[offset + 8:])
+    return quantized.astype(np.float32) * np.float32(scale)
+
+
+# Standard NPY file magic; shares its first two bytes with _NDARRAY_MAGIC,
+# so it must be checked first
+_NPY_MAGIC = b"\x93NUMPY"
+
+
+def _pack_npy(array: np.ndarray) -> bytes:
+    """Serialize a numeric array in the portable NPY v2 format"""
+    buffer = io.BytesIO()
+    np.lib.format.write_array(buffer, array, version=(2, 0), allow_pickle=False)
+    return buffer.getvalue()
+
+
+def _unpack_npy(payload: bytes) -> np.ndarray:
+    """
+    Rebuild a numpy array from NPY bytes
+    
+    Raises:
+        ValueError: If the payload is not a valid NPY array
+    """
+    try:
+        return np.lib.format.read_array(io.BytesIO(payload), allow_pickle=False)
+    except (EOFError, TypeError) as e:
+        raise ValueError(f"Invalid NPY array: {str(e)}")
+
+
+def _unpack_array(payload: bytes) -> Optional[np.ndarray]:
+    """
+    Rebuild an array from any binary array payload
+    
+    Returns:
+        np.ndarray: The array, or None if payload has no array magic
+        
+    Raises:
+        ValueError: If the payload has array magic but is malformed
+    """
+    if payload.startswith(_NPY_MAGIC):
+        return _unpack_npy(payload)
+    if payload.startswith(_NDARRAY_MAGIC):
+        return _unpack_ndarray(payload)
+    if payload.startswith(_QUANTIZED_MAGIC):
+        return _unpack_quantized(payload)
+    return None
+
+
+def _b64_length(size: int) -> int:
+    """Length of the padded standard base64 encoding of size bytes"""
+    return (size + 2) // 3 * 4
+
+
 class EmbeddingEncryptor:
     """
     Advanced encryption class for face embeddings using AES-256-GCM
     
     Features:
-    - AES-256-GCM encryption for authenticated encryption
+    - AES-256-GCM encryption for authenticated encryption, or
+      ChaCha20-Poly1305 on CPUs without AES instructions
     - PBKDF2 key derivation with configurable iterations
     - Secure salt generation and storage
     - Base64 encoding for safe transport
@@ -38,16 +420,136 @@ class EmbeddingEncryptor:
     KEY_SIZE = 32   # 256 bits
     PBKDF2_ITERATIONS = 100000  # OWASP recommended minimum
     
-    def __init__(self, iterations: int = PBKDF2_ITERATIONS):
+    # Plaintext layouts: 128 untagged native doubles, or a tag byte
+    # followed by 128 native floats (precision='f')
+    FLOAT64_PLAINTEXT_SIZE = 128 * 8
+    FLOAT32_TAG = b"\x01"
+    FLOAT32_PLAINTEXT_SIZE = 1 + 128 * 4
+    
+    # Base64 lengths of every valid password-encrypted record (salt, nonce,
+    # ciphertext and 16-byte tag), so malformed input is rejected before
+    # decoding or key derivation
+    SALTED_B64_LENGTHS = frozenset(
+        _b64_length(header + salted_size)
+        for salted_size in (SALT_SIZE + NONCE_SIZE + FLOAT64_PLAINTEXT_SIZE + 16,
+                            SALT_SIZE + NONCE_SIZE + FLOAT32_PLAINTEXT_SIZE + 16)
+        for header in (0, 1)  # Optional format byte
+    )
+    
+    KDF_CACHE_SIZE = 256
+    
+    # Records from non-default settings start with one format byte, also
+    # authenticated as associated data; its low nibble names the cipher and,
+    # in password records, its high nibble the KDF. Default AES-GCM/PBKDF2
+    # records have no format byte (the original layout).
+    CIPHER_IDS = {'aesgcm': 0, 'chacha20poly1305': 1}
+    KDF_IDS = {'pbkdf2': 0, 'argon2id': 1, 'hkdf': 2}
+    HKDF_INFO = b"ProofOfFace embedding key"
+    
+    # Argon2id cost: OWASP's minimum of 19 MiB, 2 passes, one lane
+    ARGON2_TIME_COST = 2
+    ARGON2_MEMORY_COST = 19 * 1024  # KiB
+    
+    def __init__(self, iterations: int = PBKDF2_ITERATIONS, precision: str = 'd',
+                 cache_derived_keys: bool = False, paranoid: bool = False,
+                 backend: str = 'auto', kdf: str = 'pbkdf2'):
         """
         Initialize the embedding encryptor
         
         Args:
             iterations: Number of PBKDF2 iterations (default: 100,000)
+            precision: 'd' to store embeddings losslessly as float64, or 'f'
+                to store them as float32, halving the plaintext. Records of
+                either precision always decrypt.
+            cache_derived_keys: Keep up to KDF_CACHE_SIZE derived keys in
+                memory, so repeat operations on a record (decrypt after
+                encrypt, verify_password in auth loops) skip PBKDF2. Cache
+                entries are keyed by a BLAKE2b digest of salt and password,
+                not the password itself, but a cached key still lets anyone
+                with access to process memory decrypt those records. Off by
+                default.
+            paranoid: Re-check decrypted embeddings for NaN/Inf. The GCM
+                tag already guarantees the plaintext is what
+                encrypt_embeddings validated, so this is off by default.
+            backend: AEAD for new records: 'aesgcm', 'chacha20poly1305', or
+                'auto' for AES-GCM on CPUs with AES instructions and
+                ChaCha20-Poly1305 (2-4x faster in software) elsewhere.
+                Records of either backend always decrypt.
+            kdf: Password KDF for new records: 'pbkdf2' (iterations rounds
+                of HMAC-SHA256), 'argon2id', which is memory-hard and so
+                far costlier to attack on GPUs at similar CPU cost (needs
+                argon2-cffi or cryptography 44+), or 'hkdf', a single
+                HKDF-SHA256 pass for server-side secrets that are already
+                high-entropy, such as generated API tokens. 'hkdf' offers no
+                protection for human-chosen passwords. Records of any KDF
+                always decrypt where Argon2id is available.
         """
+        if precision not in ('d', 'f'):
+            raise ValueError(f"Precision must be 'd' or 'f', got {precision!r}")
+        if backend == 'auto':
+            backend = 'aesgcm' if _AES_INSTRUCTIONS else 'chacha20poly1305'
+        if backend not in self.CIPHER_IDS:
+            raise ValueError(f"Unsupported backend: {backend}")
+        if kdf not in self.KDF_IDS:
+            raise ValueError(f"Unsupported KDF: {kdf}")
+        if kdf == 'argon2id' and not ARGON2_AVAILABLE:
+            raise ImportError("kdf='argon2id' needs argon2-cffi. Install with: pip install argon2-cffi")
+        self.backend = backend
+        self.kdf = kdf
+        cipher_id = self.CIPHER_IDS[backend]
+        self._header = bytes([cipher_id]) if cipher_id else b""
+        self._aad = self._header or None
+        # Password records also name their KDF
+        format_byte = self.KDF_IDS[kdf] << 4 | cipher_id
+        self._salted_header = bytes([format_byte]) if format_byte else b""
+        self._salted_aad = self._salted_header or None
         self.iterations = iterations
+        self.precision = precision
+        self._kdf_cache = OrderedDict() if cache_derived_keys else None
+        self.paranoid = paranoid
+        self._kdf_lock = threading.Lock()
         logger.info(f"EmbeddingEncryptor initialized with {iterations} PBKDF2 iterations")
     
+    @classmethod
+    def _split_header(cls, encrypted_data: bytes, prefix_size: int) -> tuple:
+        """
+        Separate a record's optional format byte from the original layout
+        
+        Records have fixed sizes, so the format byte is detected by length.
+        
+        Args:
+            encrypted_data: Decoded record
+            prefix_size: Bytes before the ciphertext (salt and/or nonce)
+            
+        Returns:
+            tuple: (format byte or b"", rest of the record)
+            
+        Raises:
+            ValueError: If the record size matches no known layout
+        """
+        plaintext_size = len(encrypted_data) - prefix_size - 16  # 16-byte GCM/Poly1305 tag
+        if plaintext_size in (cls.FLOAT64_PLAINTEXT_SIZE, cls.FLOAT32_PLAINTEXT_SIZE):
+            return b"", encrypted_data
+        if plaintext_size - 1 in (cls.FLOAT64_PLAINTEXT_SIZE, cls.FLOAT32_PLAINTEXT_SIZE):
+            return encrypted_data[:1], encrypted_data[1:]
+        raise ValueError(f"Encrypted data has invalid size {len(encrypted_data)}")
+    
+    @classmethod
+    def _aead_for(cls, key: bytes, header: bytes, cached: bool = True):
+        """
+        Return the AEAD instance a record's format byte names
+        
+        Password-derived keys are unique per record (every record has a
+        fresh salt), so those callers pass cached=False: caching them would
+        keep key bytes in memory and evict the reusable direct-key entries.
+        """
+        cipher_id = header[0] & 0x0F if header else 0
+        if cipher_id == cls.CIPHER_IDS['aesgcm']:
+            return _aesgcm_for(key) if cached else AESGCM(key)
+        if cipher_id == cls.CIPHER_IDS['chacha20poly1305']:
+            return _chacha20poly1305_for(key) if cached else ChaCha20Poly1305(key)
+        raise ValueError(f"Unsupported cipher id in record: {cipher_id}")
+    
     def generate_key(self) -> str:
         """
         Generate a random secure encryption key
@@ -57,7 +559,7 @@ class EmbeddingEncryptor:
         """
         try:
             # Generate 256-bit (32-byte) random key
-            key_bytes = secrets.token_bytes(self.KEY_SIZE)
+            key_bytes = _urandom(self.KEY_SIZE)
             key_hex = key_bytes.hex()
             
             logger.info("New encryption key generated")
@@ -67,27 +569,40 @@ class EmbeddingEncryptor:
             logger.error(f"Key generation failed: {str(e)}")
             raise RuntimeError(f"Failed to generate encryption key: {str(e)}")
     
-    def _derive_key(self, password: str, salt: bytes) -> bytes:
+    def _derive_key(self, password: str, salt: bytes, header: bytes = b"") -> bytes:
         """
-        Derive encryption key from password using PBKDF2
+        Derive encryption key from password with the KDF a record names
         
         Args:
             password: User password
             salt: Random salt bytes
+            header: The record's format byte, empty for PBKDF2
             
         Returns:
             bytes: Derived 256-bit key
         """
         try:
-            kdf = PBKDF2HMAC(
-                algorithm=hashes.SHA256(),
-                length=self.KEY_SIZE,
-                salt=salt,
-                iterations=self.iterations,
-                backend=default_backend()
-            )
-            
-            derived_key = kdf.derive(password.encode('utf-8'))
+            password_bytes = password.encode('utf-8')
+            salt = bytes(salt)
+            kdf_id = header[0] >> 4 if header else 0
+            
+            if self._kdf_cache is None:
+                derived_key = self._run_kdf(kdf_id, password_bytes, salt)
+                logger.debug("Key derived successfully from password")
+                return derived_key
+            
+            cache_key = hashlib.blake2b(bytes([kdf_id]) + salt + password_bytes, digest_size=16).digest()
+            with self._kdf_lock:
+                derived_key = self._kdf_cache.get(cache_key)
+                if derived_key is not None:
+                    self._kdf_cache.move_to_end(cache_key)
+                    return derived_key
+            
+            derived_key = self._run_kdf(kdf_id, password_bytes, salt)
+            with self._kdf_lock:
+                self._kdf_cache[cache_key] = derived_key
+                if len(self._kdf_cache) > self.KDF_CACHE_SIZE:
+                    self._kdf_cache.popitem(last=False)
             logger.debug("Key derived successfully from password")
             return derived_key
             
@@ -95,56 +610,144 @@ class EmbeddingEncryptor:
             logger.error(f"Key derivation failed: {str(e)}")
             raise ValueError(f"Failed to derive key from password: {str(e)}")
     
-    def encrypt_embeddings(self, embeddings: List[float], password: str) -> str:
+    def _run_kdf(self, kdf_id: int, password_bytes: bytes, salt: bytes) -> bytes:
+        """Run the KDF with the given id at this encryptor's cost settings"""
+        if kdf_id == self.KDF_IDS['pbkdf2']:
+            return _pbkdf2_sha256(password_bytes, salt, self.iterations, self.KEY_SIZE)
+        if kdf_id == self.KDF_IDS['argon2id']:
+            if not ARGON2_AVAILABLE:
+                raise ValueError("Record uses Argon2id, which needs argon2-cffi")
+            return _argon2id(password_bytes, salt, self.ARGON2_TIME_COST, self.ARGON2_MEMORY_COST, self.KEY_SIZE)
+        if kdf_id == self.KDF_IDS['hkdf']:
+            return _hkdf_sha256(password_bytes, salt, self.HKDF_INFO, self.KEY_SIZE)
+        raise ValueError(f"Unsupported KDF id in record: {kdf_id}")
+    
+    def _validate_embeddings(self, embeddings: Union[List[float], np.ndarray]) -> np.ndarray:
         """
-        Encrypt face embeddings using AES-256-GCM
+        Validate embeddings before encryption
         
         Args:
-            embeddings: List of 128 float values representing face embeddings
-            password: Password for encryption
+            embeddings: List or 1-D array of 128 float values representing face embeddings
             
         Returns:
-            str: Base64-encoded encrypted string containing salt, nonce, and ciphertext
+            np.ndarray: The embeddings as a contiguous float64 array
             
         Raises:
             ValueError: If embeddings format is invalid
-            RuntimeError: If encryption fails
         """
-        try:
-            # Validate embeddings
+        if isinstance(embeddings, np.ndarray):
+            array = embeddings
+            if array.shape != (128,):
+                raise ValueError(f"Embeddings must contain exactly 128 values, got shape {array.shape}")
+        else:
             if not isinstance(embeddings, list):
                 raise ValueError("Embeddings must be a list")
             
             if len(embeddings) != 128:
                 raise ValueError(f"Embeddings must contain exactly 128 values, got {len(embeddings)}")
             
-            # Validate all values are numbers
+            # Convert once; non-numbers give a string or object array
+            try:
+                array = np.asarray(embeddings)
+            except (TypeError, ValueError):
+                array = np.asarray(embeddings, dtype=object)
+        
+        # Checked in one vectorized pass; only the error paths look per element
+        if array.dtype.kind not in 'biuf' or array.shape != (128,):
             for i, value in enumerate(embeddings):
-                if not isinstance(value, (int, float)):
+                if not isinstance(value, (int, float, np.integer, np.floating)):
                     raise ValueError(f"All embedding values must be numbers, found {type(value).__name__} at index {i}")
-                if np.isnan(value) or np.isinf(value):
-                    raise ValueError(f"Invalid embedding value (NaN or Inf) at index {i}")
+            # All plain numbers, e.g. ints too large for int64
+            array = np.asarray(embeddings, dtype=np.float64)
+        if not np.isfinite(array).all():
+            index = int(np.flatnonzero(~np.isfinite(array))[0])
+            raise ValueError(f"Invalid embedding value (NaN or Inf) at index {index}")
+        
+        return np.ascontiguousarray(array, dtype=np.float64)
+    
+    def _pack_embeddings(self, embeddings: Union[List[float], np.ndarray]) -> bytes:
+        """
+        Pack 128 embedding values in the configured precision
+        
+        For precision 'd' this produces the same bytes as
+        struct.pack('128d', ...), but arrays are converted with a single
+        buffer copy instead of boxing each value.
+        """
+        if self.precision == 'f':
+            return self.FLOAT32_TAG + self._to_float32(embeddings).tobytes()
+        if isinstance(embeddings, np.ndarray):
+            return np.ascontiguousarray(embeddings, dtype=np.float64).tobytes()
+        return _EMBEDDING_STRUCT.pack(*embeddings)
+    
+    @staticmethod
+    def _to_float32(embeddings: Union[List[float], np.ndarray]) -> np.ndarray:
+        """
+        Cast embeddings to float32, refusing values beyond its range
+        
+        Raises:
+            ValueError: If a finite value overflows to infinity
+        """
+        with np.errstate(over='ignore'):
+            array = np.asarray(embeddings, dtype=np.float32)
+        if not np.isfinite(array).all():
+            index = int(np.flatnonzero(~np.isfinite(array))[0])
+            raise ValueError(f"Embedding value at index {index} is out of float32 range")
+        return array
+    
+    @classmethod
+    def _unpack_embeddings(cls, embeddings_bytes: bytes) -> np.ndarray:
+        """
+        Unpack decrypted embedding bytes of either precision
+        
+        Returns:
+            np.ndarray: 128 float64 values
             
-            # Convert embeddings to bytes
-            # Pack as 128 double-precision floats (8 bytes each)
-            embeddings_bytes = struct.pack('128d', *embeddings)
+        Raises:
+            ValueError: If the plaintext has neither layout
+        """
+        size = len(embeddings_bytes)
+        if size == cls.FLOAT64_PLAINTEXT_SIZE:
+            return np.frombuffer(embeddings_bytes, dtype=np.float64)
+        if size == cls.FLOAT32_PLAINTEXT_SIZE and embeddings_bytes[:1] == cls.FLOAT32_TAG:
+            return np.frombuffer(embeddings_bytes, dtype=np.float32, offset=1).astype(np.float64)
+        raise ValueError(f"Decrypted data size mismatch, expected {cls.FLOAT64_PLAINTEXT_SIZE} "
+                         f"or {cls.FLOAT32_PLAINTEXT_SIZE} bytes, got {size}")
+    
+    def encrypt_embeddings(self, embeddings: Union[List[float], np.ndarray], password: str) -> str:
+        """
+        Encrypt face embeddings using AES-256-GCM
+        
+        Args:
+            embeddings: List or array of 128 float values representing face embeddings
+            password: Password for encryption
+            
+        Returns:
+            str: Base64-encoded encrypted string containing salt, nonce, and ciphertext
+            
+        Raises:
+            ValueError: If embeddings format is invalid
+            RuntimeError: If encryption fails
+        """
+        try:
+            # Validate embeddings and pack them in the configured precision
+            embeddings_bytes = self._pack_embeddings(self._validate_embeddings(embeddings))
             
             # Generate random salt and nonce
-            salt = secrets.token_bytes(self.SALT_SIZE)
-            nonce = secrets.token_bytes(self.NONCE_SIZE)
+            salt = _urandom(self.SALT_SIZE)
+            nonce = _urandom(self.NONCE_SIZE)
             
             # Derive key from password
-            key = self._derive_key(password, salt)
+            key = self._derive_key(password, salt, self._salted_header)
             
-            # Encrypt using AES-256-GCM
-            aesgcm = AESGCM(key)
-            ciphertext = aesgcm.encrypt(nonce, embeddings_bytes, None)
+            # Encrypt using the configured AEAD
+            aead = self._aead_for(key, self._salted_header, cached=False)
+            ciphertext = aead.encrypt(nonce, embeddings_bytes, self._salted_aad)
             
-            # Combine salt + nonce + ciphertext
-            encrypted_data = salt + nonce + ciphertext
+            # Combine [format byte] + salt + nonce + ciphertext
+            encrypted_data = self._salted_header + salt + nonce + ciphertext
             
             # Encode as base64 for safe transport
-            encrypted_b64 = base64.b64encode(encrypted_data).decode('utf-8')
+            encrypted_b64 = _b64encode(encrypted_data)
             
             logger.info("Embeddings encrypted successfully")
             return encrypted_b64
@@ -167,6 +770,26 @@ class EmbeddingEncryptor:
         Returns:
             List[float]: List of 128 float values representing face embeddings
             
+        Raises:
+            ValueError: If encrypted string format is invalid or password is wrong
+            RuntimeError: If decryption fails
+        """
+        return self.decrypt_embeddings_np(encrypted_str, password).tolist()
+    
+    def decrypt_embeddings_np(self, encrypted_str: str, password: str) -> np.ndarray:
+        """
+        Decrypt face embeddings using AES-256-GCM, returning a numpy array
+        
+        Same as decrypt_embeddings, but skips boxing the 128 values into
+        Python floats when the caller wants an array anyway.
+        
+        Args:
+            encrypted_str: Base64-encoded encrypted string
+            password: Password for decryption
+            
+        Returns:
+            np.ndarray: Writable float64 array of shape (128,)
+            
         Raises:
             ValueError: If encrypted string format is invalid or password is wrong
             RuntimeError: If decryption fails
@@ -179,9 +802,16 @@ class EmbeddingEncryptor:
             if not encrypted_str:
                 raise ValueError("Encrypted string cannot be empty")
             
+            # Record sizes are fixed, so the length alone rules out malformed
+            # input without a decode or PBKDF2 run. Lengths are public, so
+            # this check leaks nothing about the password.
+            if len(encrypted_str) not in self.SALTED_B64_LENGTHS:
+                raise ValueError(f"Encrypted string has invalid length {len(encrypted_str)}, "
+                                 f"expected one of {sorted(self.SALTED_B64_LENGTHS)}")
+            
             # Decode base64
             try:
-                encrypted_data = base64.b64decode(encrypted_str.encode('utf-8'))
+                encrypted_data = _b64decode(encrypted_str)
             except Exception as e:
                 raise ValueError(f"Invalid base64 encoding: {str(e)}")
             
@@ -190,37 +820,33 @@ class EmbeddingEncryptor:
             if len(encrypted_data) < min_size:
                 raise ValueError(f"Encrypted data too short, expected at least {min_size} bytes")
             
-            # Extract salt, nonce, and ciphertext
+            # Extract format byte, salt, nonce, and ciphertext as zero-copy views
+            header, encrypted_data = self._split_header(memoryview(encrypted_data), self.SALT_SIZE + self.NONCE_SIZE)
             salt = encrypted_data[:self.SALT_SIZE]
             nonce = encrypted_data[self.SALT_SIZE:self.SALT_SIZE + self.NONCE_SIZE]
             ciphertext = encrypted_data[self.SALT_SIZE + self.NONCE_SIZE:]
             
-            # Derive key from password
-            key = self._derive_key(password, salt)
+            # Derive key from password with the KDF the record names
+            key = self._derive_key(password, salt, header)
             
-            # Decrypt using AES-256-GCM
-            aesgcm = AESGCM(key)
+            # Decrypt with the AEAD the record names
+            aead = self._aead_for(key, header, cached=False)
             try:
-                embeddings_bytes = aesgcm.decrypt(nonce, ciphertext, None)
+                embeddings_bytes = aead.decrypt(nonce, ciphertext, header or None)
             except Exception as e:
                 # This typically means wrong password or corrupted data
                 raise ValueError("Decryption failed - incorrect password or corrupted data")
             
-            # Validate decrypted data size
-            expected_size = 128 * 8  # 128 doubles, 8 bytes each
-            if len(embeddings_bytes) != expected_size:
-                raise ValueError(f"Decrypted data size mismatch, expected {expected_size} bytes, got {len(embeddings_bytes)}")
-            
-            # Unpack embeddings from bytes
-            embeddings = list(struct.unpack('128d', embeddings_bytes))
-            
-            # Validate unpacked embeddings
-            for i, value in enumerate(embeddings):
-                if np.isnan(value) or np.isinf(value):
-                    raise ValueError(f"Invalid embedding value after decryption at index {i}")
+            # The GCM tag authenticated the plaintext, so it holds exactly
+            # what encrypt_embeddings validated
+            array = self._unpack_embeddings(embeddings_bytes)
+            if self.paranoid and not np.isfinite(array).all():
+                index = int(np.flatnonzero(~np.isfinite(array))[0])
+                raise ValueError(f"Invalid embedding value after decryption at index {index}")
             
             logger.info("Embeddings decrypted successfully")
-            return embeddings
+            # frombuffer views the immutable plaintext; callers get their own copy
+            return array if array.flags.writeable else array.copy()
             
         except ValueError as e:
             logger.error(f"Decryption validation failed: {str(e)}")
@@ -229,12 +855,36 @@ class EmbeddingEncryptor:
             logger.error(f"Decryption failed: {str(e)}")
             raise RuntimeError(f"Failed to decrypt embeddings: {str(e)}")
     
-    def encrypt_embeddings_with_key(self, embeddings: List[float], key_hex: str) -> str:
+    def _parse_key_hex(self, key_hex: str) -> bytes:
+        """
+        Validate and decode a hex-encoded 256-bit key
+        
+        Args:
+            key_hex: 64-character hex string (256-bit key)
+            
+        Returns:
+            bytes: Raw key bytes
+            
+        Raises:
+            ValueError: If the key format is invalid
+        """
+        if not isinstance(key_hex, str) or len(key_hex) != 64:
+            raise ValueError("Key must be a 64-character hex string")
+        
+        # Services reuse a handful of keys, so decoding is cached per key
+        key_bytes = _key_from_hex(key_hex)
+        
+        if len(key_bytes) != self.KEY_SIZE:
+            raise ValueError(f"Key must be {self.KEY_SIZE} bytes ({self.KEY_SIZE * 2} hex characters)")
+        
+        return key_bytes
+    
+    def encrypt_embeddings_with_key(self, embeddings: Union[List[float], np.ndarray], key_hex: str) -> str:
         """
         Encrypt embeddings using a hex-encoded key directly (no password derivation)
         
         Args:
-            embeddings: List of 128 float values
+            embeddings: List or array of 128 float values
             key_hex: 64-character hex string (256-bit key)
             
         Returns:
@@ -242,36 +892,29 @@ class EmbeddingEncryptor:
         """
         try:
             # Validate key format
-            if not isinstance(key_hex, str) or len(key_hex) != 64:
-                raise ValueError("Key must be a 64-character hex string")
-            
-            try:
-                key_bytes = bytes.fromhex(key_hex)
-            except ValueError:
-                raise ValueError("Key must be valid hexadecimal")
-            
-            if len(key_bytes) != self.KEY_SIZE:
-                raise ValueError(f"Key must be {self.KEY_SIZE} bytes ({self.KEY_SIZE * 2} hex characters)")
+            key_bytes = self._parse_key_hex(key_hex)
             
             # Validate embeddings
-            if not isinstance(embeddings, list) or len(embeddings) != 128:
+            if isinstance(embeddings, np.ndarray):
+                self._validate_embeddings(embeddings)
+            elif not isinstance(embeddings, list) or len(embeddings) != 128:
                 raise ValueError("Embeddings must be a list of 128 float values")
             
             # Convert embeddings to bytes
-            embeddings_bytes = struct.pack('128d', *embeddings)
+            embeddings_bytes = self._pack_embeddings(embeddings)
             
             # Generate random nonce
-            nonce = secrets.token_bytes(self.NONCE_SIZE)
+            nonce = _urandom(self.NONCE_SIZE)
             
-            # Encrypt using AES-256-GCM
-            aesgcm = AESGCM(key_bytes)
-            ciphertext = aesgcm.encrypt(nonce, embeddings_bytes, None)
+            # Encrypt using the configured AEAD
+            aead = self._aead_for(key_bytes, self._header)
+            ciphertext = aead.encrypt(nonce, embeddings_bytes, self._aad)
             
-            # Combine nonce + ciphertext (no salt needed since key is provided directly)
-            encrypted_data = nonce + ciphertext
+            # Combine [format byte] + nonce + ciphertext (no salt needed since key is provided directly)
+            encrypted_data = self._header + nonce + ciphertext
             
             # Encode as base64
-            encrypted_b64 = base64.b64encode(encrypted_data).decode('utf-8')
+            encrypted_b64 = _b64encode(encrypted_data)
             
             logger.info("Embeddings encrypted with direct key")
             return encrypted_b64
@@ -296,27 +939,22 @@ class EmbeddingEncryptor:
         """
         try:
             # Validate key format
-            if not isinstance(key_hex, str) or len(key_hex) != 64:
-                raise ValueError("Key must be a 64-character hex string")
-            
-            try:
-                key_bytes = bytes.fromhex(key_hex)
-            except ValueError:
-                raise ValueError("Key must be valid hexadecimal")
+            key_bytes = self._parse_key_hex(key_hex)
             
             # Decode base64
-            encrypted_data = base64.b64decode(encrypted_str.encode('utf-8'))
+            encrypted_data = _b64decode(encrypted_str)
             
-            # Extract nonce and ciphertext
+            # Extract format byte, nonce and ciphertext as zero-copy views
+            header, encrypted_data = self._split_header(memoryview(encrypted_data), self.NONCE_SIZE)
             nonce = encrypted_data[:self.NONCE_SIZE]
             ciphertext = encrypted_data[self.NONCE_SIZE:]
             
-            # Decrypt using AES-256-GCM
-            aesgcm = AESGCM(key_bytes)
-            embeddings_bytes = aesgcm.decrypt(nonce, ciphertext, None)
+            # Decrypt with the AEAD the record names
+            aead = self._aead_for(key_bytes, header)
+            embeddings_bytes = aead.decrypt(nonce, ciphertext, header or None)
             
             # Unpack embeddings
-            embeddings = list(struct.unpack('128d', embeddings_bytes))
+            embeddings = self._unpack_embeddings(embeddings_bytes).tolist()
             
             logger.info("Embeddings decrypted with direct key")
             return embeddings
@@ -325,6 +963,174 @@ class EmbeddingEncryptor:
             logger.error(f"Direct key decryption failed: {str(e)}")
             raise RuntimeError(f"Failed to decrypt embeddings with key: {str(e)}")
     
+    @staticmethod
+    def _validate_embeddings_matrix(embeddings: Union[List[List[float]], np.ndarray]) -> np.ndarray:
+        """
+        Validate many embeddings and gather them into one contiguous buffer
+        
+        Args:
+            embeddings: Sequence of N embeddings or an (N, 128) array
+            
+        Returns:
+            np.ndarray: C-contiguous (N, 128) float64 array
+            
+        Raises:
+            ValueError: If any row is not 128 finite numbers
+        """
+        try:
+            buffer = np.ascontiguousarray(embeddings, dtype=np.float64)
+        except (TypeError, ValueError):
+            raise ValueError("Embeddings must be numeric with 128 values per row")
+        
+        if buffer.ndim != 2 or buffer.shape[1] != 128:
+            raise ValueError(f"Embeddings must have shape (N, 128), got {buffer.shape}")
+        
+        if not np.isfinite(buffer).all():
+            row = int(np.flatnonzero(~np.isfinite(buffer).all(axis=1))[0])
+            raise ValueError(f"Invalid embedding value (NaN or Inf) in row {row}")
+        
+        return buffer
+    
+    def encrypt_embeddings_block(self, embeddings: Union[List[List[float]], np.ndarray], key_hex: str) -> str:
+        """
+        Encrypt many embeddings as one record with a single AES-GCM call
+        
+        The (N, 128) buffer is encrypted in one pass under one nonce, so
+        the cipher setup and base64 encoding are paid once for the batch.
+        Rows cannot be decrypted individually; use encrypt_embeddings_bulk
+        when each row must be its own record.
+        
+        Args:
+            embeddings: Sequence of N embeddings or an (N, 128) array
+            key_hex: 64-character hex string (256-bit key)
+            
+        Returns:
+            str: Base64-encoded [format byte] + nonce + ciphertext of a
+                precision byte ('d' or 'f') followed by the packed rows
+        """
+        try:
+            key_bytes = self._parse_key_hex(key_hex)
+            buffer = self._validate_embeddings_matrix(embeddings)
+            
+            rows = self._to_float32(buffer) if self.precision == 'f' else buffer
+            plaintext = self.precision.encode('ascii') + rows.tobytes()
+            
+            nonce = _urandom(self.NONCE_SIZE)
+            ciphertext = self._aead_for(key_bytes, self._header).encrypt(nonce, plaintext, self._aad)
+            
+            logger.info(f"{len(buffer)} embeddings encrypted as one block")
+            return _b64encode(self._header + nonce + ciphertext)
+            
+        except ValueError as e:
+            logger.error(f"Block encryption validation failed: {str(e)}")
+            raise
+        except Exception as e:
+            logger.error(f"Block encryption failed: {str(e)}")
+            raise RuntimeError(f"Failed to encrypt embeddings block: {str(e)}")
+    
+    def decrypt_embeddings_block(self, encrypted_str: str, key_hex: str) -> np.ndarray:
+        """
+        Decrypt a record made by encrypt_embeddings_block
+        
+        Args:
+            encrypted_str: Base64-encoded encrypted block
+            key_hex: 64-character hex string (256-bit key)
+            
+        Returns:
+            np.ndarray: (N, 128) float64 array of embeddings
+        """
+        try:
+            key_bytes = self._parse_key_hex(key_hex)
+            encrypted_data = memoryview(_b64decode(encrypted_str))
+            
+            # Packed rows are a multiple of 512 bytes, which tells whether
+            # the record starts with a format byte
+            overhead = self.NONCE_SIZE + 1 + 16
+            header = encrypted_data[:1] if (len(encrypted_data) - overhead) % 512 else b""
+            encrypted_data = encrypted_data[len(header):]
+            plaintext = self._aead_for(key_bytes, header).decrypt(
+                encrypted_data[:self.NONCE_SIZE], encrypted_data[self.NONCE_SIZE:], header or None)
+            
+            dtype = {b'd': np.float64, b'f': np.float32}[plaintext[:1]]
+            embeddings = np.frombuffer(plaintext, dtype=dtype, offset=1).reshape(-1, 128)
+            
+            logger.info(f"{len(embeddings)} embeddings decrypted from one block")
+            return embeddings.astype(np.float64)
+            
+        except Exception as e:
+            logger.error(f"Block decryption failed: {str(e)}")
+            raise RuntimeError(f"Failed to decrypt embeddings block: {str(e)}")
+    
+    def encrypt_embeddings_bulk(self, embeddings: Union[List[List[float]], np.ndarray], key_hex: str) -> List[str]:
+        """
+        Encrypt many embeddings with one hex-encoded key
+        
+        The key is parsed and its AES key schedule expanded once, and all rows
+        are packed from a single contiguous (N, 128) float64 buffer. Each row
+        gets its own nonce, so every output decrypts with
+        decrypt_embeddings_with_key.
+        
+        Args:
+            embeddings: Sequence of N embeddings or an (N, 128) array
+            key_hex: 64-character hex string (256-bit key)
+            
+        Returns:
+            List[str]: N base64-encoded encrypted strings
+        """
+        try:
+            key_bytes = self._parse_key_hex(key_hex)
+            buffer = self._validate_embeddings_matrix(embeddings)
+            
+            # Encrypt each row with the shared cipher; rows are views into the buffer
+            aead = self._aead_for(key_bytes, self._header)
+            header, aad = self._header, self._aad
+            pack = self._pack_embeddings if self.precision == 'f' else np.ndarray.tobytes
+            encrypted = []
+            for row in buffer:
+                nonce = _urandom(self.NONCE_SIZE)
+                ciphertext = aead.encrypt(nonce, pack(row), aad)
+                encrypted.append(_b64encode(header + nonce + ciphertext))
+            
+            logger.info(f"{len(encrypted)} embeddings encrypted with direct key")
+            return encrypted
+            
+        except ValueError as e:
+            logger.error(f"Bulk encryption validation failed: {str(e)}")
+            raise
+        except Exception as e:
+            logger.error(f"Bulk encryption failed: {str(e)}")
+            raise RuntimeError(f"Failed to encrypt embeddings in bulk: {str(e)}")
+    
+    def decrypt_embeddings_bulk(self, encrypted_strs: List[str], key_hex: str) -> np.ndarray:
+        """
+        Decrypt many embeddings encrypted with one hex-encoded key
+        
+        Args:
+            encrypted_strs: Base64-encoded encrypted strings
+            key_hex: 64-character hex string (256-bit key)
+            
+        Returns:
+            np.ndarray: (N, 128) float64 array of embeddings
+        """
+        try:
+            key_bytes = self._parse_key_hex(key_hex)
+            
+            # Decrypt straight into one preallocated output buffer
+            embeddings = np.empty((len(encrypted_strs), 128), dtype=np.float64)
+            for i, encrypted_str in enumerate(encrypted_strs):
+                header, encrypted_data = self._split_header(memoryview(_b64decode(encrypted_str)), self.NONCE_SIZE)
+                nonce = encrypted_data[:self.NONCE_SIZE]
+                ciphertext = encrypted_data[self.NONCE_SIZE:]
+                aead = self._aead_for(key_bytes, header)
+                embeddings[i] = self._unpack_embeddings(aead.decrypt(nonce, ciphertext, header or None))
+            
+            logger.info(f"{len(encrypted_strs)} embeddings decrypted with direct key")
+            return embeddings
+            
+        except Exception as e:
+            logger.error(f"Bulk decryption failed: {str(e)}")
+            raise RuntimeError(f"Failed to decrypt embeddings in bulk: {str(e)}")
+    
     def change_password(self, encrypted_str: str, old_password: str, new_password: str) -> str:
         """
         Change the password for encrypted embeddings
@@ -351,6 +1157,47 @@ class EmbeddingEncryptor:
             logger.error(f"Password change failed: {str(e)}")
             raise RuntimeError(f"Failed to change password: {str(e)}")
     
+    def change_passwords_bulk(self, records: List[str], old_password: str, new_password: str,
+                              max_workers: Optional[int] = None) -> List[str]:
+        """
+        Change the password for many encrypted embeddings in parallel
+        
+        Each record costs two PBKDF2 runs, so re-keying is CPU bound and
+        spread over a process pool. Records are handed out in chunks to
+        keep pickling overhead low.
+        
+        Args:
+            records: Currently encrypted embeddings
+            old_password: Current password
+            new_password: New password
+            max_workers: Worker processes (default: one per CPU)
+            
+        Returns:
+            List[str]: Re-encrypted embeddings, in the order of records
+            
+        Raises:
+            RuntimeError: If any record fails to re-encrypt
+        """
+        records = list(records)
+        workers = min(max_workers or os.cpu_count() or 1, len(records))
+        if workers <= 1:
+            return [self.change_password(record, old_password, new_password) for record in records]
+        
+        settings = (self.iterations, self.precision, self.backend, self.kdf)
+        chunk_size = -(-len(records) // (workers * 4))
+        chunks = [records[i:i + chunk_size] for i in range(0, len(records), chunk_size)]
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = executor.map(_rekey_worker, [(settings, chunk, old_password, new_password)
+                                                       for chunk in chunks])
+                rekeyed = [record for chunk in results for record in chunk]
+        except Exception as e:
+            logger.error(f"Bulk password change failed: {str(e)}")
+            raise RuntimeError(f"Failed to change passwords: {str(e)}")
+        
+        logger.info(f"Password changed for {len(rekeyed)} encrypted embeddings")
+        return rekeyed
+    
     def verify_password(self, encrypted_str: str, password: str) -> bool:
         """
         Verify if a password can decrypt the embeddings
@@ -369,39 +1216,125 @@ class EmbeddingEncryptor:
             return False
 
 
+def _rekey_worker(job: tuple) -> List[str]:
+    """Re-encrypt one chunk of records in a worker process (see change_passwords_bulk)"""
+    (iterations, precision, backend, kdf), records, old_password, new_password = job
+    encryptor = EmbeddingEncryptor(iterations, precision=precision, backend=backend, kdf=kdf)
+    return [encryptor.change_password(record, old_password, new_password) for record in records]
+
+
+def _encode_str(manager: 'EncryptionManager', data: str) -> bytes:
+    return data.encode('utf-8')
+
+
+def _encode_bytes(manager: 'EncryptionManager', data: bytes) -> bytes:
+    return data
+
+
+def _encode_dict(manager: 'EncryptionManager', data: Dict) -> bytes:
+    return _json_dumps(data)
+
+
+def _encode_ndarray(manager: 'EncryptionManager', data: np.ndarray) -> bytes:
+    if data.dtype.kind in _PACKABLE_KINDS:
+        # Fixed-width arrays are packed as raw bytes behind a binary header
+        return manager._pack_array(data)
+    
+    # Serialize other numpy arrays as JSON
+    data_dict = {
+        'array_data': data.tolist(),
+        'dtype': str(data.dtype),
+        'shape': data.shape
+    }
+    return _json_dumps(data_dict)
+
+
 class EncryptionManager:
     """
     Manages encryption and decryption of sensitive data
     
     Features:
-    - Symmetric encryption using Fernet (AES 128)
+    - Symmetric encryption using Fernet (AES 128), or a single-call AEAD
+      (ChaCha20-Poly1305 / AES-256-GCM) for internal storage
     - Key derivation from passwords
     - Secure encoding/decoding of numpy arrays
     - JSON serialization support
     """
     
-    def __init__(self, encryption_key: Optional[str] = None):
+    # Password key derivation (see from_password)
+    PBKDF2_ITERATIONS = 600000  # OWASP 2023 guidance for PBKDF2-HMAC-SHA256
+    LEGACY_PBKDF2_ITERATIONS = 100000  # Default before the work factor was raised
+    SCRYPT_N = 2 ** 14
+    SCRYPT_R = 8
+    SCRYPT_P = 1
+    
+    # encrypt_data serializers by exact type; subclasses resolve through
+    # their MRO. Extend with register_encoder.
+    _ENCODERS = {
+        str: _encode_str,
+        bytes: _encode_bytes,
+        dict: _encode_dict,
+        np.ndarray: _encode_ndarray,
+    }
+    
+    def __init__(self, encryption_key: Optional[str] = None, cipher: str = 'fernet',
+                 array_format: str = 'packed'):
         """
         Initialize encryption manager
         
         Args:
             encryption_key: Base64-encoded encryption key. If None, generates a new key.
+            cipher: 'fernet' for interoperable Fernet tokens, or
+                'chacha20poly1305' / 'aes256gcm' for smaller, faster AEAD
+                tokens. 'auto' picks AES-256-GCM on CPUs with AES
+                instructions and ChaCha20-Poly1305 elsewhere. AEAD tokens
+                of either cipher decrypt under any AEAD EncryptionManager
+                with the same key, but not under 'fernet'.
+            array_format: Serialization of numeric arrays, 'packed' (compact
+                binary header) or 'npy' (standard NPY v2, readable by any NPY
+                reader). Both formats are always accepted on decryption.
         """
+        if cipher == 'auto':
+            cipher = 'aes256gcm' if _AES_INSTRUCTIONS else 'chacha20poly1305'
+        if cipher != 'fernet' and cipher not in _AEAD_CIPHERS:
+            raise ValueError(f"Unsupported cipher: {cipher}")
+        if array_format not in ('packed', 'npy'):
+            raise ValueError(f"Unsupported array format: {array_format}")
+        self.cipher = cipher
+        self.array_format = array_format
+        self._pack_array = _pack_npy if array_format == 'npy' else _pack_ndarray
+        
         if encryption_key:
-            try:
-                # Validate and use provided key
-                self.key = encryption_key.encode() if isinstance(encryption_key, str) else encryption_key
-                self.fernet = Fernet(self.key)
-                logger.info("Encryption manager initialized with provided key")
-            except Exception as e:
-                logger.error(f"Invalid encryption key provided: {str(e)}")
-                raise ValueError(f"Invalid encryption key: {str(e)}")
+            # Validate the key shape upfront: 32 bytes, url-safe base64 encoded
+            key = encryption_key.encode() if isinstance(encryption_key, str) else encryption_key
+            if len(key) != 44 or len(base64.urlsafe_b64decode(key)) != 32:
+                logger.error("Invalid encryption key provided")
+                raise ValueError("Invalid encryption key: must be 32 url-safe base64-encoded bytes")
+            
+            self.key = key
+            self.fernet = self._make_cipher()
+            logger.info("Encryption manager initialized with provided key")
         else:
             # Generate new key
             self.key = Fernet.generate_key()
-            self.fernet = Fernet(self.key)
+            self.fernet = self._make_cipher()
             logger.warning("Generated new encryption key. Save this key securely!")
             logger.info(f"New encryption key: {self.key.decode()}")
+        
+        self._key_str = self.key.decode()
+        
+        # Bound once so hot loops skip the attribute lookups per call
+        self._encrypt = self.fernet.encrypt
+        self._decrypt = self.fernet.decrypt
+        # Only Fernet tokens were ever wrapped in an extra base64 layer
+        self._legacy_wrapping = cipher == 'fernet'
+    
+    def _make_cipher(self):
+        """Build the token cipher for self.cipher over self.key"""
+        if self.cipher == 'fernet':
+            return _FernetImpl(self.key)
+        version, aead_class = _AEAD_CIPHERS[self.cipher]
+        return _AEADToken(self.key, version, aead_class)
     
     def get_key(self) -> str:
         """
@@ -410,38 +1343,97 @@ class EncryptionManager:
         Returns:
             str: Base64-encoded encryption key
         """
-        return self.key.decode()
+        return self._key_str
     
     @classmethod
-    def from_password(cls, password: str, salt: Optional[bytes] = None) -> 'EncryptionManager':
+    def from_password(cls, password: str, salt: Optional[bytes] = None,
+                      iterations: int = PBKDF2_ITERATIONS, kdf: str = 'pbkdf2',
+                      cipher: str = 'fernet') -> 'EncryptionManager':
         """
         Create encryption manager from password using key derivation
         
         Args:
             password: Password to derive key from
             salt: Salt for key derivation. If None, generates random salt.
+            iterations: PBKDF2 iterations. Keys derived before the default was
+                raised need LEGACY_PBKDF2_ITERATIONS; see calibrate_iterations
+                to size the count for the current hardware.
+            kdf: Key derivation function, 'pbkdf2' (SHA-256) or 'scrypt'
+            cipher: Token cipher, see __init__
             
         Returns:
             EncryptionManager: Instance with derived key
         """
         if salt is None:
-            salt = os.urandom(16)
+            salt = _urandom(16)
         
         # Derive key from password
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(password.encode()))
-        
-        instance = cls(key.decode())
+        if kdf == 'pbkdf2':
+            # hashlib runs the whole loop inside OpenSSL
+            derived = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations, 32)
+        elif kdf == 'scrypt':
+            kdf_impl = Scrypt(salt=salt, length=32, n=cls.SCRYPT_N, r=cls.SCRYPT_R, p=cls.SCRYPT_P)
+            derived = kdf_impl.derive(password.encode())
+        else:
+            raise ValueError(f"Unsupported key derivation function: {kdf}")
+        key = base64.urlsafe_b64encode(derived)
+        
+        instance = cls(key.decode(), cipher=cipher)
         instance.salt = salt  # Store salt for future use
+        instance.kdf = kdf
+        instance.iterations = iterations if kdf == 'pbkdf2' else None
         
         logger.info("Encryption manager created from password")
         return instance
     
+    @classmethod
+    def calibrate_iterations(cls, target_ms: float = 250, probe_iterations: int = 50000) -> int:
+        """
+        Pick a PBKDF2 iteration count that takes about target_ms on this machine
+        
+        Times one derivation at probe_iterations and scales linearly, as
+        PBKDF2 cost is proportional to the iteration count. The result is
+        never below LEGACY_PBKDF2_ITERATIONS.
+        
+        Args:
+            target_ms: Desired derivation time in milliseconds
+            probe_iterations: Iterations for the timing probe
+            
+        Returns:
+            int: Iteration count to pass to from_password
+        """
+        salt = _urandom(16)
+        start = time.perf_counter_ns()
+        hashlib.pbkdf2_hmac('sha256', b"calibration probe", salt, probe_iterations, 32)
+        measured_ms = max((time.perf_counter_ns() - start) / 1e6, 1e-3)
+        
+        iterations = int(probe_iterations * target_ms / measured_ms)
+        return max(iterations, cls.LEGACY_PBKDF2_ITERATIONS)
+    
+    def encrypt_bytes(self, data: bytes) -> str:
+        """
+        Encrypt raw bytes without type dispatch
+        
+        Args:
+            data: Bytes to encrypt
+            
+        Returns:
+            str: Encrypted token (URL-safe base64)
+        """
+        return self._encrypt(data).decode('ascii')
+    
+    def encrypt_ndarray(self, array: np.ndarray) -> str:
+        """
+        Encrypt a numeric numpy array without type dispatch
+        
+        Args:
+            array: Numeric numpy array
+            
+        Returns:
+            str: Encrypted token (URL-safe base64)
+        """
+        return self._encrypt(self._pack_array(array)).decode('ascii')
+    
     def encrypt_data(self, data: Union[str, bytes, Dict, np.ndarray]) -> str:
         """
         Encrypt various types of data
@@ -450,52 +1442,90 @@ class EncryptionManager:
             data: Data to encrypt (string, bytes, dict, or numpy array)
             
         Returns:
-            str: Base64-encoded encrypted data
+            str: Encrypted token (URL-safe base64)
         """
         try:
             # Convert data to bytes based on type
-            if isinstance(data, str):
-                data_bytes = data.encode('utf-8')
-            elif isinstance(data, bytes):
-                data_bytes = data
-            elif isinstance(data, dict):
-                data_bytes = json.dumps(data).encode('utf-8')
-            elif isinstance(data, np.ndarray):
-                # Serialize numpy array
-                data_dict = {
-                    'array_data': data.tolist(),
-                    'dtype': str(data.dtype),
-                    'shape': data.shape
-                }
-                data_bytes = json.dumps(data_dict).encode('utf-8')
-            else:
-                raise ValueError(f"Unsupported data type: {type(data)}")
+            encoder = self._ENCODERS.get(type(data)) or self._find_encoder(type(data))
+            data_bytes = encoder(self, data)
             
-            # Encrypt data
-            encrypted_data = self.fernet.encrypt(data_bytes)
+            # Encrypt data; Fernet tokens are already URL-safe base64
+            encrypted_data = self._encrypt(data_bytes)
             
-            # Return base64-encoded encrypted data
-            return base64.b64encode(encrypted_data).decode('utf-8')
+            return encrypted_data.decode('ascii')
             
         except Exception as e:
             logger.error(f"Encryption failed: {str(e)}")
             raise ValueError(f"Encryption failed: {str(e)}")
     
+    @classmethod
+    def _find_encoder(cls, data_type: type):
+        """Resolve the encoder of a type not registered exactly, e.g. a subclass"""
+        for base in data_type.__mro__[1:]:
+            encoder = cls._ENCODERS.get(base)
+            if encoder is not None:
+                return encoder
+        raise ValueError(f"Unsupported data type: {data_type}")
+    
+    @classmethod
+    def register_encoder(cls, data_type: type, encoder) -> None:
+        """
+        Teach encrypt_data to serialize another type
+        
+        Args:
+            data_type: Type to handle, including its subclasses
+            encoder: Callable (manager, data) -> bytes. Decrypt the result
+                with data_type='bytes' and decode it yourself.
+        """
+        cls._ENCODERS[data_type] = encoder
+    
+    def unwrap_legacy_token(self, encrypted_data: str) -> str:
+        """
+        Strip the extra base64 layer from a legacy token
+        
+        Legacy tokens are a third larger and cost an extra decoding pass on
+        every read; stored tokens can be migrated once with this. Current
+        tokens are returned unchanged.
+        
+        Args:
+            encrypted_data: Fernet token, or a legacy base64-wrapped token
+            
+        Returns:
+            str: The bare Fernet token
+            
+        Raises:
+            ValueError: If the token does not decrypt under this key
+        """
+        token = encrypted_data.encode('ascii')
+        if self._legacy_wrapping and not token.startswith(_FERNET_TOKEN_PREFIX):
+            try:
+                token = base64.b64decode(token)
+            except ValueError:
+                raise ValueError("Invalid legacy token encoding")
+        try:
+            self._decrypt(token)
+        except InvalidToken:
+            raise ValueError("Decryption failed: invalid token")
+        return token.decode('ascii')
+    
     def decrypt_data(self, encrypted_data: str, data_type: str = 'auto') -> Union[str, bytes, Dict, np.ndarray]:
         """
         Decrypt data and return in specified format
         
         Args:
-            encrypted_data: Base64-encoded encrypted data
+            encrypted_data: Fernet token, or a legacy base64-wrapped token
             data_type: Expected data type ('string', 'bytes', 'dict', 'numpy', 'auto')
             
         Returns:
             Decrypted data in specified format
         """
         try:
-            # Decode base64 and decrypt
-            encrypted_bytes = base64.b64decode(encrypted_data.encode('utf-8'))
-            decrypted_bytes = self.fernet.decrypt(encrypted_bytes)
+            # Decrypt the Fernet token
+            encrypted_bytes = encrypted_data.encode('ascii')
+            if self._legacy_wrapping and not encrypted_bytes.startswith(_FERNET_TOKEN_PREFIX):
+                # Legacy tokens were wrapped in an extra base64 layer
+                encrypted_bytes = base64.b64decode(encrypted_bytes)
+            decrypted_bytes = self._decrypt(encrypted_bytes)
             
             # Convert back to original format
             if data_type == 'bytes':
@@ -503,16 +1533,26 @@ class EncryptionManager:
             elif data_type == 'string':
                 return decrypted_bytes.decode('utf-8')
             elif data_type == 'dict':
-                return json.loads(decrypted_bytes.decode('utf-8'))
+                return _json_loads(decrypted_bytes)
             elif data_type == 'numpy':
-                data_dict = json.loads(decrypted_bytes.decode('utf-8'))
+                array = _unpack_array(decrypted_bytes)
+                if array is not None:
+                    return array
+                # Legacy JSON-serialized array
+                data_dict = _json_loads(decrypted_bytes)
                 array_data = np.array(data_dict['array_data'], dtype=data_dict['dtype'])
                 return array_data.reshape(data_dict['shape'])
             elif data_type == 'auto':
                 # Try to auto-detect format
+                try:
+                    array = _unpack_array(decrypted_bytes)
+                except ValueError:
+                    return decrypted_bytes
+                if array is not None:
+                    return array
                 try:
                     # Try JSON first (dict or numpy array)
-                    json_data = json.loads(decrypted_bytes.decode('utf-8'))
+                    json_data = _json_loads(decrypted_bytes)
                     if isinstance(json_data, dict) and 'array_data' in json_data:
                         # It's a numpy array
                         array_data = np.array(json_data['array_data'], dtype=json_data['dtype'])
@@ -534,12 +1574,16 @@ class EncryptionManager:
             logger.error(f"Decryption failed: {str(e)}")
             raise ValueError(f"Decryption failed: {str(e)}")
     
-    def encrypt_face_encoding(self, face_encoding: np.ndarray) -> str:
+    def encrypt_face_encoding(self, face_encoding: np.ndarray, quantize: bool = False) -> str:
         """
         Encrypt face encoding specifically
         
         Args:
             face_encoding: Face encoding numpy array
+            quantize: Store the encoding as int8 with a per-vector scale,
+                8x smaller than float64. Decrypts to a float32 approximation
+                (error at most half a quantization step), so leave it off
+                where exact values matter, e.g. for biometric hashes.
             
         Returns:
             str: Encrypted face encoding
@@ -547,7 +1591,14 @@ class EncryptionManager:
         if not isinstance(face_encoding, np.ndarray):
             raise ValueError("Face encoding must be a numpy array")
         
-        return self.encrypt_data(face_encoding)
+        if quantize:
+            if face_encoding.dtype.kind not in 'iuf' or not np.isfinite(face_encoding).all():
+                raise ValueError("Quantized face encodings must be finite numbers")
+            return self.encrypt_bytes(_pack_quantized(face_encoding))
+        
+        if face_encoding.dtype.kind not in _PACKABLE_KINDS:
+            return self.encrypt_data(face_encoding)
+        return self.encrypt_ndarray(face_encoding)
     
     def decrypt_face_encoding(self, encrypted_encoding: str) -> np.ndarray:
         """
@@ -559,7 +1610,78 @@ class EncryptionManager:
         Returns:
             np.ndarray: Decrypted face encoding
         """
-        return self.decrypt_data(encrypted_encoding, data_type='numpy')
+        return self._decrypt_numpy_fast(encrypted_encoding)
+    
+    def _decrypt_numpy_fast(self, token: str) -> np.ndarray:
+        """
+        Decrypt a binary-packed array token without format detection
+        
+        Legacy base64-wrapped tokens and JSON-serialized arrays fall back
+        to decrypt_data.
+        
+        Args:
+            token: Fernet token from encrypt_ndarray or encrypt_face_encoding
+            
+        Returns:
+            np.ndarray: Decrypted array
+        """
+        token_bytes = token.encode('ascii')
+        if not self._legacy_wrapping or token_bytes.startswith(_FERNET_TOKEN_PREFIX):
+            try:
+                payload = self._decrypt(token_bytes)
+            except InvalidToken:
+                logger.error("Decryption failed: invalid token")
+                raise ValueError("Decryption failed: invalid token")
+            
+            array = _unpack_array(payload)
+            if array is not None:
+                return array
+        
+        return self.decrypt_data(token, data_type='numpy')
+    
+    STREAM_CHUNK_SIZE = 64 * 1024
+    
+    def encrypt_stream(self, chunks: Iterable[bytes], chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+        """
+        Encrypt a byte stream into a Fernet token with constant memory
+        
+        Runs the Fernet construction (AES-128-CBC, HMAC-SHA256) incrementally.
+        Pieces are base64-encoded on 3-byte boundaries, so ''.join() of
+        the output is an ordinary Fernet token for decrypt_data.
+        
+        Args:
+            chunks: Iterable of plaintext byte chunks
+            chunk_size: Approximate size in bytes of each yielded piece
+            
+        Yields:
+            str: Consecutive pieces of the URL-safe base64 token
+        """
+        if self.cipher != 'fernet':
+            raise ValueError("encrypt_stream requires cipher='fernet'")
+        
+        # Fernet keys are a 16-byte signing key followed by a 16-byte AES key
+        raw_key = base64.urlsafe_b64decode(self.key)
+        iv = _urandom(16)
+        encryptor = Cipher(algorithms.AES(raw_key[16:]), modes.CBC(iv)).encryptor()
+        padder = padding.PKCS7(algorithms.AES.block_size).padder()
+        
+        header = b"\x80" + struct.pack(">Q", int(time.time())) + iv
+        mac = hmac.new(raw_key[:16], header, hashlib.sha256)
+        pending = bytearray(header)
+        chunk_size = max(chunk_size - chunk_size % 3, 3)
+        
+        for chunk in chunks:
+            ciphertext = encryptor.update(padder.update(chunk))
+            mac.update(ciphertext)
+            pending += ciphertext
+            while len(pending) >= chunk_size:
+                yield base64.urlsafe_b64encode(pending[:chunk_size]).decode('ascii')
+                del pending[:chunk_size]
+        
+        ciphertext = encryptor.update(padder.finalize()) + encryptor.finalize()
+        mac.update(ciphertext)
+        pending += ciphertext + mac.digest()
+        yield base64.urlsafe_b64encode(pending).decode('ascii')
     
     def encrypt_json(self, data: Dict[str, Any]) -> str:
         """
@@ -586,23 +1708,56 @@ class EncryptionManager:
         return self.decrypt_data(encrypted_data, data_type='dict')
 
 
+@dataclass(slots=True)
+class _EncryptedBlock:
+    """One encrypted (N, D) matrix shared by the entries stored from it"""
+    encrypted_matrix: str
+
+
+@dataclass(slots=True)
+class _StoredEntry:
+    """One SecureStorage record"""
+    encrypted_encoding: Optional[str]  # None for rows of a block
+    metadata: Dict
+    timestamp: int  # time.time_ns() at storage; see SecureStorage.get_timestamp
+    block: Optional[_EncryptedBlock] = None
+    row: int = 0
+
+
 class SecureStorage:
     """
     Secure storage wrapper for sensitive data
     Combines encryption with additional security measures
     """
     
-    def __init__(self, encryption_manager: EncryptionManager):
+    DEFAULT_SHARDS = 16
+    
+    def __init__(self, encryption_manager: EncryptionManager, num_shards: int = DEFAULT_SHARDS):
         """
         Initialize secure storage
         
         Args:
             encryption_manager: Encryption manager instance
+            num_shards: Number of independently locked shards, rounded up
+                to a power of two
         """
+        if num_shards < 1:
+            raise ValueError("num_shards must be at least 1")
+        
         self.encryption_manager = encryption_manager
-        self.storage = {}  # In-memory storage (use database in production)
+        
+        # In-memory storage (use database in production), sharded by
+        # identifier hash so concurrent requests rarely share a lock
+        num_shards = 1 << (num_shards - 1).bit_length()
+        self._shard_mask = num_shards - 1
+        self._shards = [{} for _ in range(num_shards)]
+        self._locks = [threading.Lock() for _ in range(num_shards)]
         logger.info("Secure storage initialized")
     
+    def _shard_index(self, identifier: str) -> int:
+        """Return the index of the shard holding identifier"""
+        return hash(identifier) & self._shard_mask
+    
     def store_face_encoding(self, identifier: str, face_encoding: np.ndarray, metadata: Optional[Dict] = None) -> bool:
         """
         Securely store face encoding with metadata
@@ -620,14 +1775,12 @@ class SecureStorage:
             encrypted_encoding = self.encryption_manager.encrypt_face_encoding(face_encoding)
             
             # Prepare storage entry
-            entry = {
-                'encrypted_encoding': encrypted_encoding,
-                'metadata': metadata or {},
-                'timestamp': np.datetime64('now').isoformat()
-            }
+            entry = _StoredEntry(encrypted_encoding, metadata or {}, time.time_ns())
             
             # Store entry
-            self.storage[identifier] = entry
+            index = self._shard_index(identifier)
+            with self._locks[index]:
+                self._shards[index][identifier] = entry
             
             logger.info(f"Face encoding stored for identifier: {identifier}")
             return True
@@ -636,6 +1789,109 @@ class SecureStorage:
             logger.error(f"Failed to store face encoding: {str(e)}")
             return False
     
+    def store_face_encodings_batch(self, identifiers: List[str], face_encodings: np.ndarray,
+                                   metadatas: Optional[List[Optional[Dict]]] = None) -> bool:
+        """
+        Securely store many face encodings at once, e.g. for gallery enrollment
+        
+        All rows are encrypted before any is stored, so either every
+        encoding is stored or none is.
+        
+        Args:
+            identifiers: Unique identifier for each row
+            face_encodings: (N, D) array with one face encoding per row
+            metadatas: Optional metadata for each row
+            
+        Returns:
+            bool: True if storage successful
+        """
+        try:
+            face_encodings = self._check_batch(identifiers, face_encodings, metadatas)
+            encrypt_ndarray = self.encryption_manager.encrypt_ndarray
+            timestamp = time.time_ns()
+            
+            # Encrypt every row, grouping entries by shard
+            pending = {}
+            for i, identifier in enumerate(identifiers):
+                entry = _StoredEntry(
+                    encrypt_ndarray(face_encodings[i]),
+                    (metadatas[i] if metadatas is not None else None) or {},
+                    timestamp
+                )
+                pending.setdefault(self._shard_index(identifier), {})[identifier] = entry
+            
+            self._insert_pending(pending)
+            logger.info(f"Stored {len(identifiers)} face encodings in batch")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Failed to store face encodings batch: {str(e)}")
+            return False
+    
+    def store_face_encodings_bulk(self, identifiers: List[str], face_encodings: np.ndarray,
+                                  metadatas: Optional[List[Optional[Dict]]] = None,
+                                  dtype: np.dtype = np.float32) -> bool:
+        """
+        Securely store many face encodings as one encrypted block
+        
+        Unlike store_face_encodings_batch, the whole (N, D) matrix is
+        encrypted with a single call and each identifier keeps a row index
+        into it. Enrollment is much cheaper, but retrieving one encoding
+        decrypts the whole block, and a block's ciphertext is only freed once
+        all of its identifiers are deleted or overwritten.
+        
+        Args:
+            identifiers: Unique identifier for each row
+            face_encodings: (N, D) array with one face encoding per row
+            metadatas: Optional metadata for each row
+            dtype: Storage dtype; float32 halves the block and keeps far more
+                precision than face matching needs
+            
+        Returns:
+            bool: True if storage successful
+        """
+        try:
+            face_encodings = self._check_batch(identifiers, face_encodings, metadatas)
+            matrix = np.ascontiguousarray(face_encodings, dtype=dtype)
+            block = _EncryptedBlock(self.encryption_manager.encrypt_ndarray(matrix))
+            timestamp = time.time_ns()
+            
+            pending = {}
+            for i, identifier in enumerate(identifiers):
+                entry = _StoredEntry(
+                    None,
+                    (metadatas[i] if metadatas is not None else None) or {},
+                    timestamp,
+                    block,
+                    i
+                )
+                pending.setdefault(self._shard_index(identifier), {})[identifier] = entry
+            
+            self._insert_pending(pending)
+            logger.info(f"Stored {len(identifiers)} face encodings in one block")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Failed to store face encodings block: {str(e)}")
+            return False
+    
+    @staticmethod
+    def _check_batch(identifiers: List[str], face_encodings: np.ndarray,
+                     metadatas: Optional[List[Optional[Dict]]]) -> np.ndarray:
+        """Validate batch arguments, returning the encodings as an (N, D) array"""
+        face_encodings = np.asarray(face_encodings)
+        if face_encodings.ndim != 2 or len(face_encodings) != len(identifiers):
+            raise ValueError("face_encodings must be (N, D) with one row per identifier")
+        if metadatas is not None and len(metadatas) != len(identifiers):
+            raise ValueError("metadatas must have one entry per identifier")
+        return face_encodings
+    
+    def _insert_pending(self, pending: Dict[int, Dict[str, _StoredEntry]]) -> None:
+        """Insert entries grouped by shard index, taking each shard lock once"""
+        for index, entries in pending.items():
+            with self._locks[index]:
+                self._shards[index].update(entries)
+    
     def retrieve_face_encoding(self, identifier: str) -> Optional[np.ndarray]:
         """
         Retrieve and decrypt face encoding
@@ -647,15 +1903,20 @@ class SecureStorage:
             np.ndarray: Decrypted face encoding or None if not found
         """
         try:
-            if identifier not in self.storage:
+            index = self._shard_index(identifier)
+            with self._locks[index]:
+                entry = self._shards[index].get(identifier)
+            
+            if entry is None:
                 logger.warning(f"Face encoding not found for identifier: {identifier}")
                 return None
             
-            entry = self.storage[identifier]
-            encrypted_encoding = entry['encrypted_encoding']
-            
             # Decrypt and return face encoding
-            face_encoding = self.encryption_manager.decrypt_face_encoding(encrypted_encoding)
+            if entry.block is not None:
+                matrix = self.encryption_manager.decrypt_data(entry.block.encrypted_matrix, data_type='numpy')
+                face_encoding = matrix[entry.row].copy()
+            else:
+                face_encoding = self.encryption_manager.decrypt_face_encoding(entry.encrypted_encoding)
             
             logger.debug(f"Face encoding retrieved for identifier: {identifier}")
             return face_encoding
@@ -675,8 +1936,11 @@ class SecureStorage:
             bool: True if deletion successful
         """
         try:
-            if identifier in self.storage:
-                del self.storage[identifier]
+            index = self._shard_index(identifier)
+            with self._locks[index]:
+                entry = self._shards[index].pop(identifier, None)
+            
+            if entry is not None:
                 logger.info(f"Face encoding deleted for identifier: {identifier}")
                 return True
             else:
@@ -687,6 +1951,36 @@ class SecureStorage:
             logger.error(f"Failed to delete face encoding: {str(e)}")
             return False
     
+    def get_timestamp(self, identifier: str) -> Optional[str]:
+        """
+        Get when an encoding was stored, formatted on demand
+        
+        Args:
+            identifier: Unique identifier for the encoding
+            
+        Returns:
+            str: ISO-8601 UTC timestamp to the second, or None if not found
+        """
+        timestamp = self.get_timestamp_ns(identifier)
+        if timestamp is None:
+            return None
+        return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(timestamp // 1_000_000_000))
+    
+    def get_timestamp_ns(self, identifier: str) -> Optional[int]:
+        """
+        Get when an encoding was stored, as stored
+        
+        Args:
+            identifier: Unique identifier for the encoding
+            
+        Returns:
+            int: time.time_ns() at storage, or None if not found
+        """
+        index = self._shard_index(identifier)
+        with self._locks[index]:
+            entry = self._shards[index].get(identifier)
+        return None if entry is None else entry.timestamp
+    
     def list_identifiers(self) -> list:
         """
         List all stored identifiers
@@ -694,21 +1988,26 @@ class SecureStorage:
         Returns:
             list: List of stored identifiers
         """
-        return list(self.storage.keys())
+        identifiers = []
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                identifiers.extend(shard)
+        return identifiers
 
 
 # Utility functions
-def create_encryption_manager(key: Optional[str] = None) -> EncryptionManager:
+def create_encryption_manager(key: Optional[str] = None, cipher: str = 'fernet') -> EncryptionManager:
     """
     Factory function to create encryption manager
     
     Args:
         key: Optional encryption key
+        cipher: Token cipher, see EncryptionManager
         
     Returns:
         EncryptionManager: Configured encryption manager
     """
-    return EncryptionManager(key)
+    return EncryptionManager(key, cipher=cipher)
 
 
 def create_embedding_encryptor(iterations: int = 100000) -> EmbeddingEncryptor:
@@ -745,6 +2044,12 @@ def generate_embedding_key() -> str:
     return encryptor.generate_key()
 
 
+@lru_cache(maxsize=32)
+def _manager_for(encryption_key: str) -> EncryptionManager:
+    """Return a shared EncryptionManager per key, so Fernet is built once"""
+    return EncryptionManager(encryption_key)
+
+
 def encrypt_face_encoding(face_encoding: np.ndarray, encryption_key: str) -> str:
     """
     Convenience function to encrypt face encoding
@@ -756,8 +2061,7 @@ def encrypt_face_encoding(face_encoding: np.ndarray, encryption_key: str) -> str
     Returns:
         str: Encrypted face encoding
     """
-    manager = EncryptionManager(encryption_key)
-    return manager.encrypt_face_encoding(face_encoding)
+    return _manager_for(encryption_key).encrypt_face_encoding(face_encoding)
 
 
 def decrypt_face_encoding(encrypted_encoding: str, encryption_key: str) -> np.ndarray:
@@ -771,8 +2075,7 @@ def decrypt_face_encoding(encrypted_encoding: str, encryption_key: str) -> np.nd
     Returns:
         np.ndarray: Decrypted face encoding
     """
-    manager = EncryptionManager(encryption_key)
-    return manager.decrypt_face_encoding(encrypted_encoding)
+    return _manager_for(encryption_key).decrypt_face_encoding(encrypted_encoding)
 
 
 def encrypt_embeddings(embeddings: List[float], password: str) -> str:
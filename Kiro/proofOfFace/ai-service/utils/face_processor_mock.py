@@ -248,16 +248,8 @@ class MockFaceProcessor:
             Dict: Comparison result with match status and distance
         """
         try:
-            # Mock face distance calculation using cosine similarity
-            dot_product = np.dot(known_encoding, candidate_encoding)
-            norm_a = np.linalg.norm(known_encoding)
-            norm_b = np.linalg.norm(candidate_encoding)
-            
-            if norm_a == 0 or norm_b == 0:
-                distance = 1.0
-            else:
-                cosine_similarity = dot_product / (norm_a * norm_b)
-                distance = 1.0 - cosine_similarity
+            # Euclidean face distance, as FaceProcessor and face_recognition use
+            distance = float(np.linalg.norm(np.asarray(known_encoding) - np.asarray(candidate_encoding)))
             
             # Determine match based on tolerance
             is_match = distance <= self.tolerance
@@ -268,7 +260,7 @@ class MockFaceProcessor:
             return {
                 "match": is_match,
                 "distance": float(distance),
-                "similarity": float(1.0 - distance)
+                "similarity": max(0.0, 1.0 - distance)
             }
             
         except Exception as e:
@@ -338,12 +330,13 @@ class MockFaceProcessor:
         except Exception:
             return False
     
-    def extract_embeddings(self, image_file: Union[str, bytes, io.BytesIO]) -> Dict[str, Any]:
+    def extract_embeddings(self, image_file: Union[str, bytes, io.BytesIO, np.ndarray]) -> Dict[str, Any]:
         """
         Mock extract face embeddings from image file
         
         Args:
-            image_file: Image file path, bytes, or BytesIO object
+            image_file: Image file path, bytes, BytesIO object, or an already
+                       decoded RGB image array of shape (height, width, 3)
         
         Returns:
             Dict containing mock embedding results
@@ -366,6 +359,8 @@ class MockFaceProcessor:
                 image_data = image_file
             elif isinstance(image_file, io.BytesIO):
                 image_data = image_file.getvalue()
+            elif isinstance(image_file, np.ndarray):
+                image_data = None
             else:
                 return {
                     "success": False,
@@ -373,8 +368,17 @@ class MockFaceProcessor:
                     "processing_time": time.time() - start_time
                 }
             
-            # Process image
-            result = self.process_image(image_data)
+            # Process image; decoded arrays skip the file decoding step
+            if image_data is not None:
+                result = self.process_image(image_data)
+            elif image_file.ndim == 3 and image_file.shape[2] == 3:
+                result = self.detect_faces(image_file)
+            else:
+                return {
+                    "success": False,
+                    "error": f"Image array must have shape (height, width, 3), got {image_file.shape}",
+                    "processing_time": time.time() - start_time
+                }
             
             if result.success:
                 # Convert to expected format
@@ -419,11 +423,11 @@ class MockFaceProcessor:
             Dict containing comparison results
         """
         try:
-            # Convert to numpy arrays if needed
+            # Convert lists to numpy arrays; ndarrays are used as-is without a copy
             if isinstance(embedding1, list):
-                embedding1 = np.array(embedding1)
+                embedding1 = np.asarray(embedding1, dtype=np.float64)
             if isinstance(embedding2, list):
-                embedding2 = np.array(embedding2)
+                embedding2 = np.asarray(embedding2, dtype=np.float64)
             
             # Validate embeddings
             if not self.validate_face_encoding(embedding1):
@@ -452,6 +456,62 @@ class MockFaceProcessor:
                 "distance": 1.0,
                 "error": str(e)
             }
+    
+    def compare_embeddings_batch(self, 
+                                 embedding: Union[List[float], np.ndarray], 
+                                 candidates: Union[List[List[float]], np.ndarray], 
+                                 threshold: float = 0.6) -> Dict[str, Any]:
+        """
+        Mock compare one face embedding against N candidate embeddings
+        
+        Takes the same arguments and returns the same Euclidean distances
+        as FaceProcessor.compare_embeddings_batch.
+        
+        Args:
+            embedding: Probe face embedding (128-dimensional)
+            candidates: Candidate embeddings as an (N, 128) matrix
+            threshold: Distance threshold (0.0-1.0, default 0.6)
+        
+        Returns:
+            Dict containing per-candidate arrays:
+            - matches: np.ndarray of bool, shape (N,)
+            - similarities: np.ndarray of float, shape (N,)
+            - distances: np.ndarray of float, shape (N,)
+        """
+        try:
+            if threshold < 0.0 or threshold > 1.0:
+                raise ValueError("Threshold must be between 0.0 and 1.0")
+            
+            probe = np.asarray(embedding, dtype=np.float64)
+            gallery = np.asarray(candidates, dtype=np.float64)
+            
+            # Validate embeddings
+            if not self.validate_face_encoding(probe):
+                raise ValueError("Invalid probe embedding")
+            
+            if gallery.ndim != 2 or gallery.shape[1] != 128:
+                raise ValueError(f"Candidates must have shape (N, 128), got {gallery.shape}")
+            
+            if not np.isfinite(gallery).all():
+                raise ValueError("Candidates contain NaN or infinite values")
+            
+            # Euclidean distance against every candidate at once
+            distances = np.linalg.norm(gallery - probe, axis=1)
+            
+            return {
+                "matches": distances <= threshold,
+                "similarities": np.maximum(0.0, 1.0 - distances),
+                "distances": distances
+            }
+            
+        except Exception as e:
+            logger.error(f"Mock batch face comparison failed: {str(e)}")
+            return {
+                "matches": np.zeros(0, dtype=bool),
+                "similarities": np.zeros(0),
+                "distances": np.zeros(0),
+                "error": str(e)
+            }
 
 
 def create_mock_face_processor(tolerance: float = 0.6, 
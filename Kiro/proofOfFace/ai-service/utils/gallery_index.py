@@ -0,0 +1,164 @@
+"""
+Gallery Index Module for ProofOfFace AI Service
+Nearest-neighbour search of a probe face embedding over an enrolled gallery
+"""
+
+import numpy as np
+from typing import List, Optional, Tuple, Union
+import logging
+
+try:
+    import faiss  # Optional product-quantized search for large galleries
+except ImportError:
+    faiss = None
+
+logger = logging.getLogger(__name__)
+
+
+class FaceGalleryIndex:
+    """
+    Searchable gallery of face embeddings
+    
+    Methods:
+    - 'exact': float32 matrix in memory, searched with one BLAS product
+      per probe. Needs only numpy; 512 bytes per face.
+    - 'pq': faiss IndexPQ, compressing each face to m bytes (16 by
+      default, 32x smaller) with approximate distances.
+    - 'ivfpq': faiss IndexIVFPQ, which also only scans the nprobe of
+      nlist clusters nearest the probe. For galleries of 100k+ faces.
+    
+    The PQ methods must be trained on a representative sample before
+    faces are added; 'ivfpq' needs at least 39 * nlist training vectors.
+    """
+    
+    METHODS = ('exact', 'pq', 'ivfpq')
+    
+    def __init__(self,
+                 method: str = 'exact',
+                 dim: int = 128,
+                 m: int = 16,
+                 nbits: int = 8,
+                 nlist: int = 1024,
+                 nprobe: int = 16):
+        """
+        Initialize an empty gallery
+        
+        Args:
+            method: 'exact', 'pq' or 'ivfpq' (see class docstring)
+            dim: Embedding dimension
+            m: PQ sub-quantizers, i.e. bytes per face at nbits=8
+            nbits: Bits per sub-quantizer code
+            nlist: IVF clusters ('ivfpq' only)
+            nprobe: IVF clusters scanned per search ('ivfpq' only)
+        """
+        if method not in self.METHODS:
+            raise ValueError(f"Unsupported index method: {method}")
+        if method != 'exact' and faiss is None:
+            raise ImportError(f"method='{method}' needs faiss. Install with: pip install faiss-cpu")
+        
+        self.method = method
+        self.dim = dim
+        self.identifiers: List[str] = []
+        
+        if method == 'exact':
+            self._index = None
+            self._matrix = np.empty((0, dim), dtype=np.float32)
+            self._sq_norms = np.empty(0, dtype=np.float32)
+        elif method == 'pq':
+            self._index = faiss.IndexPQ(dim, m, nbits)
+        else:
+            self._quantizer = faiss.IndexFlatL2(dim)
+            self._index = faiss.IndexIVFPQ(self._quantizer, dim, nlist, m, nbits)
+            self._index.nprobe = nprobe
+        
+        logger.info(f"FaceGalleryIndex initialized with method={method}, dim={dim}")
+    
+    def _as_matrix(self, embeddings: Union[List[List[float]], np.ndarray]) -> np.ndarray:
+        """Validate embeddings as a contiguous (N, dim) float32 matrix"""
+        matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[1] != self.dim:
+            raise ValueError(f"Embeddings must have shape (N, {self.dim}), got {matrix.shape}")
+        if not np.isfinite(matrix).all():
+            raise ValueError("Embeddings contain NaN or infinite values")
+        return matrix
+    
+    @property
+    def is_trained(self) -> bool:
+        """Whether faces can be added"""
+        return self._index is None or self._index.is_trained
+    
+    def train(self, embeddings: Union[List[List[float]], np.ndarray]) -> None:
+        """
+        Learn the PQ codebooks (and IVF clusters) from sample embeddings
+        
+        Args:
+            embeddings: (N, dim) representative sample
+        """
+        if self._index is None:
+            return
+        self._index.train(self._as_matrix(embeddings))
+        logger.info(f"FaceGalleryIndex trained on {len(embeddings)} embeddings")
+    
+    def add(self, identifiers: List[str], embeddings: Union[List[List[float]], np.ndarray]) -> None:
+        """
+        Add faces to the gallery
+        
+        Args:
+            identifiers: One identifier per row
+            embeddings: (N, dim) embeddings
+        
+        Raises:
+            ValueError: If shapes mismatch or the index is untrained
+        """
+        matrix = self._as_matrix(embeddings)
+        if len(identifiers) != len(matrix):
+            raise ValueError("identifiers must have one entry per embedding")
+        if not self.is_trained:
+            raise ValueError("Index must be trained before adding faces")
+        
+        if self._index is None:
+            self._matrix = np.concatenate([self._matrix, matrix])
+            self._sq_norms = np.concatenate([self._sq_norms, np.einsum('ij,ij->i', matrix, matrix)])
+        else:
+            self._index.add(matrix)
+        self.identifiers.extend(identifiers)
+    
+    def __len__(self) -> int:
+        return len(self.identifiers)
+    
+    def search(self,
+               probe: Union[List[float], np.ndarray],
+               k: int = 5,
+               threshold: Optional[float] = None) -> List[Tuple[str, float]]:
+        """
+        Find the gallery faces nearest to a probe
+        
+        Args:
+            probe: Probe embedding
+            k: Most results to return
+            threshold: Optional Euclidean distance cut-off
+        
+        Returns:
+            List of (identifier, distance), nearest first. Distances are
+            approximate for the PQ methods.
+        """
+        query = self._as_matrix(np.reshape(probe, (1, -1)))
+        k = min(k, len(self))
+        if k == 0:
+            return []
+        
+        if self._index is None:
+            squared = self._sq_norms - 2.0 * (self._matrix @ query[0]) + query[0] @ query[0]
+            rows = np.argpartition(squared, k - 1)[:k]
+            rows = rows[np.argsort(squared[rows])]
+            squared = squared[rows]
+        else:
+            squared, rows = self._index.search(query, k)
+            squared, rows = squared[0], rows[0]
+            found = rows >= 0
+            squared, rows = squared[found], rows[found]
+        
+        distances = np.sqrt(np.maximum(squared, 0.0))
+        return [(self.identifiers[row], float(distance))
+                for row, distance in zip(rows, distances)
+                if threshold is None or distance <= threshold]